@@ -0,0 +1,100 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Compiled PNPoly and line-of-sight kernels for deployments without Numba.
+
+Same algorithms and array layouts as the loops in _kernels.py; _kernels
+picks this module up automatically when it has been built:
+
+    cythonize -i -3 _geom_c.pyx
+"""
+
+import numpy as np
+
+from libc.math cimport floor, fabs, INFINITY
+from libc.stdint cimport uint64_t
+
+
+def pnpoly_batch(const double[::1] xs, const double[::1] zs, const double[:, ::1] verts):
+    """PNPoly crossing-number test of every (xs[k], zs[k]) against an (N, 2) vertex array."""
+    cdef Py_ssize_t n = xs.shape[0]
+    cdef Py_ssize_t m = verts.shape[0]
+    cdef Py_ssize_t k, i, j
+    cdef double px, pz, xi, zi, xj, zj
+    cdef bint c
+
+    out = np.zeros(n, dtype=np.bool_)
+    cdef unsigned char[::1] inside = out.view(np.uint8)
+    with nogil:
+        for k in range(n):
+            px = xs[k]
+            pz = zs[k]
+            c = False
+            j = m - 1
+            for i in range(m):
+                xi = verts[i, 0]
+                zi = verts[i, 1]
+                xj = verts[j, 0]
+                zj = verts[j, 1]
+                if ((zi > pz) != (zj > pz)) and (px < (xj - xi) * (pz - zi) / (zj - zi) + xi):
+                    c = not c
+                j = i
+            inside[k] = c
+    return out
+
+
+def los_batch(
+    const double[::1] x0, const double[::1] z0,
+    const double[::1] x1, const double[::1] z1,
+    const uint64_t[:, ::1] grid_bits, long n_cols,
+    double min_x, double min_z, double cell_size
+):
+    """
+    Amanatides-Woo DDA from (x0[k], z0[k]) to (x1[k], z1[k]) over a grid
+    packed by _kernels.pack_grid_bits; True where the ray is blocked.
+    """
+    cdef Py_ssize_t n = x0.shape[0]
+    cdef long rows = grid_bits.shape[0]
+    cdef Py_ssize_t k
+    cdef long col, row, n_x, n_z, step_x, step_z
+    cdef double dx, dz, t_max_x, t_max_z, t_delta_x, t_delta_z
+
+    out = np.zeros(n, dtype=np.bool_)
+    cdef unsigned char[::1] blocked = out.view(np.uint8)
+    with nogil:
+        for k in range(n):
+            dx = x1[k] - x0[k]
+            dz = z1[k] - z0[k]
+            col = <long>floor((x0[k] - min_x) / cell_size)
+            row = <long>floor((z0[k] - min_z) / cell_size)
+            n_x = abs(<long>floor((x1[k] - min_x) / cell_size) - col)
+            n_z = abs(<long>floor((z1[k] - min_z) / cell_size) - row)
+            step_x = 1 if dx > 0 else -1
+            step_z = 1 if dz > 0 else -1
+
+            # Ray parameter t in [0, 1] at the next column / row boundary
+            t_max_x = INFINITY
+            t_delta_x = INFINITY
+            if dx != 0:
+                t_max_x = ((col + (1 if dx > 0 else 0)) * cell_size + min_x - x0[k]) / dx
+                t_delta_x = cell_size / fabs(dx)
+            t_max_z = INFINITY
+            t_delta_z = INFINITY
+            if dz != 0:
+                t_max_z = ((row + (1 if dz > 0 else 0)) * cell_size + min_z - z0[k]) / dz
+                t_delta_z = cell_size / fabs(dz)
+
+            while n_x + n_z > 0:
+                if n_z == 0 or (n_x > 0 and t_max_x < t_max_z):
+                    col += step_x
+                    t_max_x += t_delta_x
+                    n_x -= 1
+                else:
+                    row += step_z
+                    t_max_z += t_delta_z
+                    n_z -= 1
+                if 0 <= row < rows and 0 <= col < n_cols and (
+                    (grid_bits[row, col >> 6] >> (col & 63)) & 1
+                ):
+                    blocked[k] = True
+                    break
+    return out
@@ -0,0 +1,320 @@
+"""
+Numerical kernels for the LiDAR placement solver.
+
+Polygons are (N, 2) float64 vertex arrays and points / ray endpoints are
+float64 coordinate arrays. Kernels are compiled with Numba when it is
+installed; otherwise the Cython extension (_geom_c.pyx) is used if it has
+been built, and the vectorized NumPy versions if not.
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    # Numba is optional; every kernel has a NumPy fallback
+    HAS_NUMBA = False
+    prange = range
+
+try:
+    import _geom_c
+    HAS_GEOM_C = True
+except ImportError:
+    # Compiled extension is optional too: cythonize -i -3 _geom_c.pyx
+    _geom_c = None
+    HAS_GEOM_C = False
+
+
+def pnpoly_batch(xs: np.ndarray, zs: np.ndarray, verts: np.ndarray) -> np.ndarray:
+    """Ray casting test of every (xs[k], zs[k]) against an (N, 2) vertex array."""
+    return _pnpoly(
+        np.ascontiguousarray(xs, dtype=np.float64),
+        np.ascontiguousarray(zs, dtype=np.float64),
+        np.ascontiguousarray(verts, dtype=np.float64)
+    )
+
+
+def _pnpoly_loop(xs, zs, verts):
+    """PNPoly crossing-number loop, one point per prange iteration."""
+    inside = np.zeros(xs.shape[0], dtype=np.bool_)
+    n = verts.shape[0]
+    for k in prange(xs.shape[0]):
+        px = xs[k]
+        pz = zs[k]
+        j = n - 1
+        for i in range(n):
+            xi, zi = verts[i, 0], verts[i, 1]
+            xj, zj = verts[j, 0], verts[j, 1]
+            if ((zi > pz) != (zj > pz)) and (px < (xj - xi) * (pz - zi) / (zj - zi) + xi):
+                inside[k] = not inside[k]
+            j = i
+    return inside
+
+
+# Points per chunk in the NumPy kernel, bounding its (points, edges) temporaries
+PNPOLY_CHUNK = 1 << 14
+
+
+def _pnpoly_numpy(xs, zs, verts):
+    """
+    PNPoly over all edges at once: build the (points, edges) crossing matrix
+    and XOR-reduce it along the edges.
+    """
+    xi, zi = verts[:, 0], verts[:, 1]
+    xj, zj = np.roll(xi, 1), np.roll(zi, 1)
+    inside = np.zeros(xs.shape[0], dtype=np.bool_)
+    
+    # Horizontal edges divide by zero, but never straddle the ray
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, xs.shape[0], PNPOLY_CHUNK):
+            px = xs[start:start + PNPOLY_CHUNK, None]
+            pz = zs[start:start + PNPOLY_CHUNK, None]
+            straddles = (zi > pz) != (zj > pz)
+            crosses = straddles & (px < (xj - xi) * (pz - zi) / (zj - zi) + xi)
+            inside[start:start + PNPOLY_CHUNK] = np.bitwise_xor.reduce(crosses, axis=1)
+    return inside
+
+
+def pack_grid_bits(grid: np.ndarray) -> np.ndarray:
+    """
+    Pack a boolean (rows, cols) occupancy grid into (rows, ceil(cols / 64))
+    uint64 words; cell (r, c) is bit c & 63 of word [r, c >> 6].
+    """
+    rows, cols = grid.shape
+    padded = np.zeros((rows, ((cols + 63) // 64) * 64), dtype=bool)
+    padded[:, :cols] = grid
+    return np.ascontiguousarray(
+        np.packbits(padded, axis=1, bitorder='little').view('<u8')
+    )
+
+
+def los_pairs(
+    x0: np.ndarray, z0: np.ndarray,
+    x1: np.ndarray, z1: np.ndarray,
+    grid_bits: np.ndarray, n_cols: int,
+    min_x: float, min_z: float,
+    cell_size: float
+) -> np.ndarray:
+    """
+    Trace the ray from (x0[k], z0[k]) to (x1[k], z1[k]) for every k over the
+    packed occupancy grid (see pack_grid_bits; n_cols is the unpacked width)
+    and return True where it is blocked.
+
+    Rays are traced with an Amanatides-Woo DDA that visits exactly the grid
+    cells the segment crosses, excluding the start cell and including the
+    end cell, and stops at the first occupied cell. Cells outside the grid
+    never block.
+    """
+    return _los_pairs(
+        np.ascontiguousarray(x0, dtype=np.float64),
+        np.ascontiguousarray(z0, dtype=np.float64),
+        np.ascontiguousarray(x1, dtype=np.float64),
+        np.ascontiguousarray(z1, dtype=np.float64),
+        np.ascontiguousarray(grid_bits, dtype=np.uint64), int(n_cols),
+        float(min_x), float(min_z), float(cell_size)
+    )
+
+
+def _los_pairs_numpy(x0, z0, x1, z1, grid_bits, cols, min_x, min_z, cell_size):
+    """NumPy DDA: every active ray advances one cell per iteration."""
+    dx = x1 - x0
+    dz = z1 - z0
+    col = np.floor((x0 - min_x) / cell_size).astype(np.int64)
+    row = np.floor((z0 - min_z) / cell_size).astype(np.int64)
+    n_x = np.abs(np.floor((x1 - min_x) / cell_size).astype(np.int64) - col)
+    n_z = np.abs(np.floor((z1 - min_z) / cell_size).astype(np.int64) - row)
+    step_x = np.where(dx > 0, 1, -1)
+    step_z = np.where(dz > 0, 1, -1)
+    
+    # Ray parameter t in [0, 1] at the next column / row boundary
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_max_x = np.where(dx != 0, ((col + (dx > 0)) * cell_size + min_x - x0) / dx, np.inf)
+        t_max_z = np.where(dz != 0, ((row + (dz > 0)) * cell_size + min_z - z0) / dz, np.inf)
+        t_delta_x = np.where(dx != 0, cell_size / np.abs(dx), np.inf)
+        t_delta_z = np.where(dz != 0, cell_size / np.abs(dz), np.inf)
+    
+    blocked = np.zeros(x0.shape[0], dtype=bool)
+    rows = grid_bits.shape[0]
+    while True:
+        active = np.flatnonzero((n_x + n_z > 0) & ~blocked)
+        if active.size == 0:
+            break
+        
+        move_x = (n_z[active] == 0) | ((n_x[active] > 0) & (t_max_x[active] < t_max_z[active]))
+        ax = active[move_x]
+        az = active[~move_x]
+        col[ax] += step_x[ax]
+        t_max_x[ax] += t_delta_x[ax]
+        n_x[ax] -= 1
+        row[az] += step_z[az]
+        t_max_z[az] += t_delta_z[az]
+        n_z[az] -= 1
+        
+        r = row[active]
+        c = col[active]
+        on_grid = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        hit = np.zeros(active.size, dtype=bool)
+        r, c = r[on_grid], c[on_grid]
+        words = grid_bits[r, c >> 6]
+        hit[on_grid] = ((words >> (c & 63).astype(np.uint64)) & np.uint64(1)) != 0
+        blocked[active[hit]] = True
+    
+    return blocked
+
+
+def _los_pairs_loop(x0, z0, x1, z1, grid_bits, cols, min_x, min_z, cell_size):
+    """Numba DDA, one ray per prange iteration."""
+    n = x0.shape[0]
+    blocked = np.zeros(n, dtype=np.bool_)
+    rows = grid_bits.shape[0]
+    for k in prange(n):
+        dx = x1[k] - x0[k]
+        dz = z1[k] - z0[k]
+        col = int(math.floor((x0[k] - min_x) / cell_size))
+        row = int(math.floor((z0[k] - min_z) / cell_size))
+        n_x = abs(int(math.floor((x1[k] - min_x) / cell_size)) - col)
+        n_z = abs(int(math.floor((z1[k] - min_z) / cell_size)) - row)
+        step_x = 1 if dx > 0 else -1
+        step_z = 1 if dz > 0 else -1
+        
+        # Ray parameter t in [0, 1] at the next column / row boundary
+        t_max_x = math.inf
+        t_delta_x = math.inf
+        if dx != 0:
+            t_max_x = ((col + (1 if dx > 0 else 0)) * cell_size + min_x - x0[k]) / dx
+            t_delta_x = cell_size / abs(dx)
+        t_max_z = math.inf
+        t_delta_z = math.inf
+        if dz != 0:
+            t_max_z = ((row + (1 if dz > 0 else 0)) * cell_size + min_z - z0[k]) / dz
+            t_delta_z = cell_size / abs(dz)
+        
+        while n_x + n_z > 0:
+            if n_z == 0 or (n_x > 0 and t_max_x < t_max_z):
+                col += step_x
+                t_max_x += t_delta_x
+                n_x -= 1
+            else:
+                row += step_z
+                t_max_z += t_delta_z
+                n_z -= 1
+            if 0 <= row < rows and 0 <= col < cols and (
+                (grid_bits[row, col >> 6] >> np.uint64(col & 63)) & np.uint64(1)
+            ):
+                blocked[k] = True
+                break
+    return blocked
+
+
+def wedge_filter(
+    pos_indptr: np.ndarray, pos_points: np.ndarray,
+    xs: np.ndarray, zs: np.ndarray,
+    pos_xs: np.ndarray, pos_zs: np.ndarray,
+    pos_of_cand: np.ndarray,
+    fwd_x: np.ndarray, fwd_z: np.ndarray,
+    cos_half_hfov: float
+):
+    """
+    HFOV wedge test for every candidate against the points its position
+    sees, pos_points[pos_indptr[p]:pos_indptr[p + 1]] for position p.
+
+    A point is inside candidate c's wedge when its unit bearing from the
+    position, dotted with (fwd_x[c], fwd_z[c]), is at least cos_half_hfov;
+    a point at the position gets bearing +x. Returns the CSR
+    (indptr, indices) of each candidate's points, in position order.
+    """
+    return _wedge(
+        np.ascontiguousarray(pos_indptr, dtype=np.int64),
+        np.ascontiguousarray(pos_points, dtype=np.int64),
+        np.ascontiguousarray(xs, dtype=np.float64),
+        np.ascontiguousarray(zs, dtype=np.float64),
+        np.ascontiguousarray(pos_xs, dtype=np.float64),
+        np.ascontiguousarray(pos_zs, dtype=np.float64),
+        np.ascontiguousarray(pos_of_cand, dtype=np.int64),
+        np.ascontiguousarray(fwd_x, dtype=np.float64),
+        np.ascontiguousarray(fwd_z, dtype=np.float64),
+        float(cos_half_hfov)
+    )
+
+
+def _wedge_numpy(pos_indptr, pos_points, xs, zs, pos_xs, pos_zs, pos_of_cand,
+                 fwd_x, fwd_z, cos_half_hfov):
+    """NumPy wedge test: all candidates at a position in one (yaws, points) broadcast."""
+    n = pos_of_cand.shape[0]
+    n_pos = pos_indptr.shape[0] - 1
+    order = np.argsort(pos_of_cand, kind='stable')
+    group_start = np.searchsorted(pos_of_cand[order], np.arange(n_pos + 1))
+    
+    hits = [np.empty(0, dtype=np.int64)] * n
+    for p in range(n_pos):
+        group = order[group_start[p]:group_start[p + 1]]
+        near = pos_points[pos_indptr[p]:pos_indptr[p + 1]]
+        if group.size == 0 or near.size == 0:
+            continue
+        dx = xs[near] - pos_xs[p]
+        dz = zs[near] - pos_zs[p]
+        dist = np.hypot(dx, dz)
+        at_sensor = dist == 0
+        dist[at_sensor] = 1.0
+        ux = np.where(at_sensor, 1.0, dx / dist)
+        uz = dz / dist
+        in_wedge = ux * fwd_x[group, None] + uz * fwd_z[group, None] >= cos_half_hfov
+        for c, mask in zip(group, in_wedge):
+            hits[c] = near[mask]
+    
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([h.size for h in hits], out=indptr[1:])
+    return indptr, np.concatenate(hits + [np.empty(0, dtype=np.int64)])
+
+
+def _in_wedge(dx, dz, fx, fz, cos_half_hfov):
+    """Scalar wedge test for _wedge_loop, matching the NumPy broadcast exactly."""
+    dist = math.hypot(dx, dz)
+    if dist == 0:
+        return fx >= cos_half_hfov
+    return (dx / dist) * fx + (dz / dist) * fz >= cos_half_hfov
+
+
+def _wedge_loop(pos_indptr, pos_points, xs, zs, pos_xs, pos_zs, pos_of_cand,
+                fwd_x, fwd_z, cos_half_hfov):
+    """Numba wedge test, one candidate per prange iteration: count, then fill."""
+    n = pos_of_cand.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    for c in prange(n):
+        p = pos_of_cand[c]
+        count = 0
+        for e in range(pos_indptr[p], pos_indptr[p + 1]):
+            if _in_wedge(xs[pos_points[e]] - pos_xs[p], zs[pos_points[e]] - pos_zs[p],
+                         fwd_x[c], fwd_z[c], cos_half_hfov):
+                count += 1
+        counts[c] = count
+    
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(counts)
+    indices = np.empty(indptr[n], dtype=np.int64)
+    for c in prange(n):
+        p = pos_of_cand[c]
+        w = indptr[c]
+        for e in range(pos_indptr[p], pos_indptr[p + 1]):
+            if _in_wedge(xs[pos_points[e]] - pos_xs[p], zs[pos_points[e]] - pos_zs[p],
+                         fwd_x[c], fwd_z[c], cos_half_hfov):
+                indices[w] = pos_points[e]
+                w += 1
+    return indptr, indices
+
+
+if HAS_NUMBA:
+    _pnpoly = njit(parallel=True, cache=True)(_pnpoly_loop)
+    _los_pairs = njit(parallel=True, cache=True)(_los_pairs_loop)
+    _in_wedge = njit(inline='always', cache=True)(_in_wedge)
+    _wedge = njit(parallel=True, cache=True)(_wedge_loop)
+elif HAS_GEOM_C:
+    _pnpoly = _geom_c.pnpoly_batch
+    _los_pairs = _geom_c.los_batch
+    _wedge = _wedge_numpy
+else:
+    _pnpoly = _pnpoly_numpy
+    _los_pairs = _los_pairs_numpy
+    _wedge = _wedge_numpy
@@ -2,22 +2,130 @@
 """
 Flask server for LiDAR placement solver.
 Exposes the OR-Tools CP-SAT solver via HTTP API.
+
+In production run it under Gunicorn (see wsgi.py); `python server.py`
+starts Flask's development server.
 """
 
+import hashlib
+import json
+import multiprocessing as mp
 import os
+import threading
+from collections import OrderedDict
 from flask import Flask, request, jsonify
-from solver import solve_lidar_placement
+from solver import solve_lidar_placement, SOLVER_VERSION
 
 app = Flask(__name__)
 
 # Port from environment or default
 PORT = int(os.environ.get('LIDAR_SOLVER_PORT', 3002))
 
+# Solves run in a process pool so a long CP-SAT search never holds the GIL
+# of the worker serving HTTP. Spawn avoids forking a process whose CP-SAT
+# or Numba threads may already be running.
+#
+# Each Gunicorn worker (LIDAR_SOLVER_WORKERS, set by start.sh) gets its own
+# pool and an equal share of the CPUs. A sync worker serves one request at
+# a time, so its pool needs a single process, and that solve may use the
+# whole share for CP-SAT workers, seed portfolio threads and Numba kernels.
+GUNICORN_WORKERS = max(1, int(os.environ.get('LIDAR_SOLVER_WORKERS', 1)))
+CPUS_PER_WORKER = max(1, (os.cpu_count() or 1) // GUNICORN_WORKERS)
+SOLVER_PROCESSES = int(os.environ.get('LIDAR_SOLVER_PROCESSES', 0)) or 1
+
+# solve_lidar_placement runs CP-SAT at most twice (the first solve or seed
+# portfolio, then the relaxed k=1 retry), each bounded by the time limit;
+# the margin covers sampling, coverage, model building and process startup.
+SOLVE_TIMEOUT_MARGIN_S = float(os.environ.get('LIDAR_SOLVER_TIMEOUT_MARGIN_S', 30.0))
+
+# Hard cap on a request, kept below Gunicorn's --timeout (start.sh adds 30 s)
+# so the client gets a 504 instead of the worker being killed
+MAX_SOLVE_S = float(os.environ.get('LIDAR_SOLVER_MAX_SOLVE_S', 570.0))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_solver_process(cpus: int) -> None:
+    """Pool initializer: limit the CPUs a solve uses (see solver.solver_cpus)."""
+    os.environ['LIDAR_SOLVER_CPUS'] = str(cpus)
+    try:
+        import numba
+        numba.set_num_threads(min(cpus, numba.config.NUMBA_NUM_THREADS))
+    except ImportError:
+        pass
+
+
+def _get_pool():
+    """The solver pool, created on first use (after Gunicorn has forked)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = mp.get_context('spawn').Pool(
+                SOLVER_PROCESSES, initializer=_init_solver_process, initargs=(CPUS_PER_WORKER,)
+            )
+        return _pool
+
+
+def _kill_pool(pool) -> None:
+    """
+    Terminate a pool whose solve timed out, so the abandoned CP-SAT search
+    does not keep a process busy; the next request starts a fresh pool.
+    Other solves still running in it (only possible under the threaded
+    development server) fail with a 504 at their own timeout.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.terminate()
+
+
+def solve_timeout_s(time_limit_s: float) -> float:
+    """Wall-clock limit for one /solve request with the given CP-SAT time limit."""
+    return min(2 * time_limit_s + SOLVE_TIMEOUT_MARGIN_S, MAX_SOLVE_S)
+
+# LRU cache of successful results, keyed on the solver version plus the
+# canonical JSON of the request
+RESULT_CACHE_SIZE = 256
+_result_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+def canonical_json(params: dict) -> str:
+    """Serialize params so that equal requests give identical strings."""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+
+def cache_key(params: dict) -> bytes:
+    """blake2b digest of the solver version and the canonical request."""
+    return hashlib.blake2b(
+        (SOLVER_VERSION + '\n' + canonical_json(params)).encode()
+    ).digest()
+
+
+def cache_get(key: bytes):
+    """Cached result for key (marking it most recently used), or None."""
+    with _result_cache_lock:
+        result = _result_cache.get(key)
+        if result is not None:
+            _result_cache.move_to_end(key)
+        return result
+
+
+def cache_put(key: bytes, result: dict) -> None:
+    """Store result, evicting the least recently used entries over RESULT_CACHE_SIZE."""
+    with _result_cache_lock:
+        _result_cache[key] = result
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'ok', 'service': 'lidar-solver'})
+    return jsonify({'status': 'ok', 'service': 'lidar-solver', 'version': SOLVER_VERSION})
 
 
 @app.route('/solve', methods=['POST'])
@@ -35,7 +143,8 @@ def solve():
             mount_y_m, sample_spacing_m, candidate_spacing_m,
             keepout_distance_m, overlap_mode, k_required,
             overlap_target_pct, los_enabled, los_cell_m,
-            yaw_step_deg, max_sensors, solver_time_limit_s, seed
+            yaw_step_deg, max_sensors, solver_time_limit_s, seed,
+            num_workers, deterministic, seed_portfolio
         }
     }
     """
@@ -43,9 +152,34 @@ def solve():
         params = request.get_json()
         if not params:
             return jsonify({'success': False, 'error': 'No JSON body provided'}), 400
+        if not isinstance(params, dict):
+            return jsonify({'success': False, 'error': 'JSON body must be an object'}), 400
+        
+        key = cache_key(params)
+        cached = cache_get(key)
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers['X-Solver-Cache'] = 'hit'
+            return response
+        
+        time_limit_s = float((params.get('settings') or {}).get('solver_time_limit_s', 10.0))
+        timeout_s = solve_timeout_s(time_limit_s)
+        pool = _get_pool()
+        pending = pool.apply_async(solve_lidar_placement, (params,))
+        try:
+            result = pending.get(timeout=timeout_s)
+        except mp.TimeoutError:
+            _kill_pool(pool)
+            return jsonify({
+                'success': False,
+                'error': f'Solver did not finish within {timeout_s:.0f}s'
+            }), 504
         
-        result = solve_lidar_placement(params)
-        return jsonify(result)
+        if result.get('success'):
+            cache_put(key, result)
+        response = jsonify(result)
+        response.headers['X-Solver-Cache'] = 'miss'
+        return response
     
     except Exception as e:
         import traceback
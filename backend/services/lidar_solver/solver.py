@@ -6,14 +6,32 @@ Implements k-coverage optimization for LiDAR sensor placement.
 
 import json
 import math
-import random
-from typing import List, Dict, Tuple, Optional, Set
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, Set, Union
 from dataclasses import dataclass, field
 from ortools.sat.python import cp_model
 import numpy as np
-from shapely.geometry import Point, Polygon, LineString
+import shapely
+from shapely.geometry import Polygon, LineString
+from shapely.geometry.base import BaseGeometry
 from shapely.ops import unary_union
 
+from _kernels import pnpoly_batch, pack_grid_bits, los_pairs, wedge_filter
+
+# Bump when a change alters placements for the same inputs (results cached
+# by the server are keyed on it)
+SOLVER_VERSION = "1.2.0"
+
+
+def solver_cpus() -> int:
+    """
+    CPUs one solve may use for CP-SAT workers and seed portfolio threads:
+    LIDAR_SOLVER_CPUS if set (the server sets its per-worker share), else
+    the CPU count.
+    """
+    return int(os.environ.get('LIDAR_SOLVER_CPUS', 0)) or os.cpu_count() or 1
+
 
 @dataclass
 class LidarModel:
@@ -21,6 +39,13 @@ class LidarModel:
     vfov_deg: float = 30.0
     range_m: float = 10.0
     dome_mode: bool = True
+    # Derived once per model; the coverage code reads these instead of redoing the trig
+    tan_half_vfov: float = field(init=False, repr=False, compare=False)
+    cos_half_hfov: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.tan_half_vfov = math.tan(math.radians(self.vfov_deg * 0.5))
+        self.cos_half_hfov = math.cos(math.radians(self.hfov_deg * 0.5))
 
 
 @dataclass
@@ -38,6 +63,9 @@ class PlannerSettings:
     max_sensors: int = 50
     solver_time_limit_s: float = 10.0
     seed: int = 42
+    num_workers: int = 0  # CP-SAT search workers, 0 = min(8, solver_cpus())
+    deterministic: bool = False  # True = single worker, so the same seed gives the same placement
+    seed_portfolio: int = 0  # seeds solved in parallel in place of one solve (0 = off)
 
 
 @dataclass
@@ -46,7 +74,9 @@ class Candidate:
     x: float
     z: float
     yaw_deg: float
+    position_id: int = 0  # index into the grid positions; yaws vary fastest
     covered_points: List[int] = field(default_factory=list)
+    cov_bits: Optional[np.ndarray] = None  # uint64 bitset, bit i = points[i]
 
 
 @dataclass
@@ -57,6 +87,96 @@ class SamplePoint:
     is_critical: bool = False
 
 
+class SamplePoints:
+    """
+    Sample points as parallel arrays (struct of arrays); point i is
+    (xs[i], zs[i]). Indexing and iteration yield SamplePoint copies, so
+    changes must be made through the arrays.
+    """
+    __slots__ = ('xs', 'zs', 'is_critical')
+    
+    def __init__(self, xs, zs, is_critical=None):
+        self.xs = np.ascontiguousarray(xs, dtype=np.float64)
+        self.zs = np.ascontiguousarray(zs, dtype=np.float64)
+        if is_critical is None:
+            is_critical = np.zeros(self.xs.shape[0], dtype=bool)
+        self.is_critical = np.asarray(is_critical, dtype=bool)
+    
+    @classmethod
+    def from_list(cls, points: List[SamplePoint]) -> 'SamplePoints':
+        """Build from SamplePoint objects whose idx values are 0, 1, 2, ..."""
+        return cls(
+            [p.x for p in points], [p.z for p in points],
+            [p.is_critical for p in points]
+        )
+    
+    @property
+    def xz(self) -> np.ndarray:
+        return np.column_stack([self.xs, self.zs])
+    
+    def __len__(self) -> int:
+        return self.xs.shape[0]
+    
+    def __getitem__(self, i: int) -> SamplePoint:
+        i = range(len(self))[i]
+        return SamplePoint(
+            idx=i, x=float(self.xs[i]), z=float(self.zs[i]),
+            is_critical=bool(self.is_critical[i])
+        )
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class Candidates:
+    """
+    Candidate sensor poses as parallel arrays (struct of arrays).
+    
+    compute_coverage_sets fills covered (per candidate, the ascending
+    positions of the points it covers) and cov_bits, a (C, W) uint64 matrix
+    whose row c has bit i set when candidate c covers points[i]. Indexing and
+    iteration yield Candidate copies.
+    """
+    __slots__ = ('xs', 'zs', 'yaws', 'position_ids', 'covered', 'cov_bits')
+    
+    def __init__(self, xs, zs, yaws, position_ids=None):
+        self.xs = np.ascontiguousarray(xs, dtype=np.float64)
+        self.zs = np.ascontiguousarray(zs, dtype=np.float64)
+        self.yaws = np.ascontiguousarray(yaws, dtype=np.float64)
+        if position_ids is None:
+            position_ids = np.zeros(self.xs.shape[0], dtype=np.int64)
+        self.position_ids = np.asarray(position_ids, dtype=np.int64)
+        self.covered: Optional[List[np.ndarray]] = None
+        self.cov_bits: Optional[np.ndarray] = None
+    
+    @classmethod
+    def from_list(cls, candidates: List[Candidate]) -> 'Candidates':
+        """Build from Candidate objects whose idx values are 0, 1, 2, ..."""
+        return cls(
+            [c.x for c in candidates], [c.z for c in candidates],
+            [c.yaw_deg for c in candidates], [c.position_id for c in candidates]
+        )
+    
+    @property
+    def xz(self) -> np.ndarray:
+        return np.column_stack([self.xs, self.zs])
+    
+    def __len__(self) -> int:
+        return self.xs.shape[0]
+    
+    def __getitem__(self, i: int) -> Candidate:
+        i = range(len(self))[i]
+        return Candidate(
+            idx=i, x=float(self.xs[i]), z=float(self.zs[i]),
+            yaw_deg=float(self.yaws[i]), position_id=int(self.position_ids[i]),
+            covered_points=self.covered[i].tolist() if self.covered is not None else [],
+            cov_bits=self.cov_bits[i] if self.cov_bits is not None else None
+        )
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
 @dataclass
 class SolverResult:
     success: bool
@@ -91,168 +211,216 @@ def compute_effective_radius(model: LidarModel, mount_height: float) -> float:
         return model.range_m * 0.9  # 90% of max range for floor coverage
     else:
         # Downward-facing or partial HFOV - VFOV limits floor coverage
-        alpha_rad = math.radians(model.vfov_deg / 2)
-        r_vfov = mount_height * math.tan(alpha_rad)
-        return min(model.range_m, r_vfov)
+        return min(model.range_m, mount_height * model.tan_half_vfov)
 
 
-def point_in_polygon(px: float, pz: float, polygon: List[Dict]) -> bool:
+class PreparedPolygon:
+    """
+    Polygon converted once for repeated point-in-polygon tests: the (N, 2)
+    vertex array and its (min_x, min_z, max_x, max_z) bounding box, used to
+    reject points before the PNPoly kernel. Named to avoid shapely's Polygon.
+    """
+    __slots__ = ('xy', 'bbox')
+    
+    def __init__(self, polygon: 'PolygonLike'):
+        self.xy = _poly_to_array(polygon)
+        min_x, min_z = self.xy.min(axis=0) if len(self.xy) else (np.inf, np.inf)
+        max_x, max_z = self.xy.max(axis=0) if len(self.xy) else (-np.inf, -np.inf)
+        self.bbox = (float(min_x), float(min_z), float(max_x), float(max_z))
+    
+    def __len__(self) -> int:
+        return self.xy.shape[0]
+    
+    def contains(self, xs: np.ndarray, zs: np.ndarray) -> np.ndarray:
+        """PNPoly test of every (xs[k], zs[k]); points outside the bbox are never inside."""
+        xs = np.asarray(xs, dtype=np.float64)
+        zs = np.asarray(zs, dtype=np.float64)
+        min_x, min_z, max_x, max_z = self.bbox
+        in_box = (xs >= min_x) & (xs <= max_x) & (zs >= min_z) & (zs <= max_z)
+        if in_box.all():
+            return pnpoly_batch(xs, zs, self.xy)
+        inside = np.zeros(xs.shape[0], dtype=bool)
+        if in_box.any():
+            inside[in_box] = pnpoly_batch(xs[in_box], zs[in_box], self.xy)
+        return inside
+
+
+# A polygon is a list of {x, z} vertex dicts (the API format), an (N, 2)
+# array or a PreparedPolygon
+PolygonLike = Union[List[Dict], np.ndarray, PreparedPolygon]
+
+
+def _poly_to_array(polygon: PolygonLike) -> np.ndarray:
+    """Contiguous (N, 2) float64 vertex array for any PolygonLike."""
+    if isinstance(polygon, PreparedPolygon):
+        return polygon.xy
+    if isinstance(polygon, np.ndarray):
+        return np.ascontiguousarray(polygon, dtype=np.float64).reshape(-1, 2)
+    return np.asarray([[v['x'], v['z']] for v in polygon], dtype=np.float64).reshape(-1, 2)
+
+
+def point_in_polygon(px: float, pz: float, polygon: PolygonLike) -> bool:
     """Ray casting point-in-polygon test."""
-    n = len(polygon)
-    inside = False
-    j = n - 1
-    for i in range(n):
-        xi, zi = polygon[i]['x'], polygon[i]['z']
-        xj, zj = polygon[j]['x'], polygon[j]['z']
-        if ((zi > pz) != (zj > pz)) and (px < (xj - xi) * (pz - zi) / (zj - zi) + xi):
-            inside = not inside
-        j = i
-    return inside
+    inside = point_in_polygon_batch(
+        np.array([px], dtype=np.float64), np.array([pz], dtype=np.float64), polygon
+    )
+    return bool(inside[0])
+
+
+def point_in_polygon_batch(xs: np.ndarray, zs: np.ndarray, polygon: PolygonLike) -> np.ndarray:
+    """
+    Ray casting test of every (xs[k], zs[k]). Pass a PreparedPolygon when
+    testing the same polygon repeatedly.
+    """
+    if not isinstance(polygon, PreparedPolygon):
+        polygon = PreparedPolygon(polygon)
+    return polygon.contains(xs, zs)
+
+
+def grid_axis(lo: float, hi: float, spacing_m: float) -> np.ndarray:
+    """Cell-centered grid coordinates lo + spacing/2, lo + 3*spacing/2, ... up to hi."""
+    n = int(math.floor((hi - lo - spacing_m / 2) / spacing_m)) + 1
+    return lo + spacing_m / 2 + np.arange(max(n, 0)) * spacing_m
+
+
+def build_obstacle_union(obstacles: Optional[List[PolygonLike]]) -> Optional[BaseGeometry]:
+    """
+    Merge the valid obstacle polygons into one prepared geometry.
+    Returns None if there are no usable obstacles.
+    """
+    obstacle_polys = []
+    for obs in obstacles or []:
+        if len(obs) >= 3:
+            try:
+                obs_poly = Polygon(_poly_to_array(obs))
+                if obs_poly.is_valid:
+                    obstacle_polys.append(obs_poly)
+            except:
+                pass
+    
+    if not obstacle_polys:
+        return None
+    obstacle_union = unary_union(obstacle_polys)
+    shapely.prepare(obstacle_union)
+    return obstacle_union
+
+
+def make_rng(seed: Union[int, np.random.Generator]) -> np.random.Generator:
+    """
+    Generator for a solve: an existing Generator is passed through, an int
+    seeds an explicit PCG64 so streams don't depend on NumPy's default choice.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.Generator(np.random.PCG64(seed))
 
 
 def sample_points_in_polygon(
-    polygon: List[Dict],
+    polygon: PolygonLike,
     spacing_m: float,
-    seed: int,
-    obstacles: Optional[List[List[Dict]]] = None
-) -> List[SamplePoint]:
+    seed: Union[int, np.random.Generator],
+    obstacle_union: Optional[BaseGeometry] = None
+) -> SamplePoints:
     """
     Generate sample points inside polygon using jittered grid.
-    Excludes points inside obstacle polygons.
+    Excludes points inside obstacle_union (see build_obstacle_union).
+    seed may be an int or a np.random.Generator; the global RNGs are not touched.
     """
-    random.seed(seed)
-    np.random.seed(seed)
+    rng = make_rng(seed)
     
-    xs = [v['x'] for v in polygon]
-    zs = [v['z'] for v in polygon]
-    min_x, max_x = min(xs), max(xs)
-    min_z, max_z = min(zs), max(zs)
+    roi = polygon if isinstance(polygon, PreparedPolygon) else PreparedPolygon(polygon)
+    min_x, min_z, max_x, max_z = roi.bbox
     
-    # Create shapely polygon for faster operations
-    poly = Polygon([(v['x'], v['z']) for v in polygon])
+    # Full grid, x-major like the candidate grid
+    gx, gz = np.meshgrid(
+        grid_axis(min_x, max_x, spacing_m),
+        grid_axis(min_z, max_z, spacing_m),
+        indexing='ij'
+    )
+    gx, gz = gx.ravel(), gz.ravel()
     
-    # Create obstacle polygons
-    obstacle_polys = []
-    if obstacles:
-        for obs in obstacles:
-            if len(obs) >= 3:
-                try:
-                    obs_poly = Polygon([(v['x'], v['z']) for v in obs])
-                    if obs_poly.is_valid:
-                        obstacle_polys.append(obs_poly)
-                except:
-                    pass
-    
-    # Merge obstacles
-    obstacle_union = unary_union(obstacle_polys) if obstacle_polys else None
-    
-    points = []
-    idx = 0
+    # Add jitter for more uniform coverage
     jitter = spacing_m * 0.25
+    offsets = rng.uniform(-jitter, jitter, size=(gx.size, 2))
+    gx = gx + offsets[:, 0]
+    gz = gz + offsets[:, 1]
     
-    x = min_x + spacing_m / 2
-    while x <= max_x:
-        z = min_z + spacing_m / 2
-        while z <= max_z:
-            # Add jitter for more uniform coverage
-            jx = x + random.uniform(-jitter, jitter)
-            jz = z + random.uniform(-jitter, jitter)
-            
-            pt = Point(jx, jz)
-            
-            # Check if inside main polygon and outside obstacles
-            if poly.contains(pt):
-                if obstacle_union is None or not obstacle_union.contains(pt):
-                    points.append(SamplePoint(idx=idx, x=jx, z=jz))
-                    idx += 1
-            
-            z += spacing_m
-        x += spacing_m
+    # Keep points inside main polygon (one batched PNPoly pass) and outside obstacles
+    inside = roi.contains(gx, gz)
+    if obstacle_union:
+        inside &= ~shapely.contains_xy(obstacle_union, gx, gz)
     
-    return points
+    return SamplePoints(gx[inside], gz[inside])
 
 
 def mark_critical_points(
-    points: List[SamplePoint],
-    critical_polygon: Optional[List[Dict]] = None,
+    points: SamplePoints,
+    critical_polygon: Optional[PolygonLike] = None,
     boundary_band_m: float = 0.0
 ) -> None:
     """Mark points as critical if inside critical polygon or within boundary band."""
-    if critical_polygon and len(critical_polygon) >= 3:
-        crit_poly = Polygon([(v['x'], v['z']) for v in critical_polygon])
-        for pt in points:
-            if crit_poly.contains(Point(pt.x, pt.z)):
-                pt.is_critical = True
+    if critical_polygon is not None and len(critical_polygon) >= 3:
+        crit_poly = Polygon(_poly_to_array(critical_polygon))
+        points.is_critical |= shapely.contains_xy(crit_poly, points.xs, points.zs)
 
 
 def generate_candidates(
-    polygon: List[Dict],
+    polygon: PolygonLike,
     spacing_m: float,
     keepout_m: float,
     model: LidarModel,
-    seed: int,
-    obstacles: Optional[List[List[Dict]]] = None
-) -> List[Candidate]:
+    seed: Union[int, np.random.Generator],
+    obstacle_union: Optional[BaseGeometry] = None
+) -> Candidates:
     """
     Generate candidate sensor positions with yaw angles.
     For 360° HFOV, only yaw=0. For partial HFOV, generate multiple yaw candidates.
+    Candidates are ordered position-major: candidate i is at position
+    i // n_yaws with yaw index i % n_yaws.
+    The candidate grid is deterministic; seed is accepted to mirror
+    sample_points_in_polygon.
     """
-    random.seed(seed)
-    
-    xs = [v['x'] for v in polygon]
-    zs = [v['z'] for v in polygon]
-    min_x, max_x = min(xs), max(xs)
-    min_z, max_z = min(zs), max(zs)
+    verts = _poly_to_array(polygon)
+    min_x, min_z = verts.min(axis=0)
+    max_x, max_z = verts.max(axis=0)
     
     # Create shapely polygon
-    poly = Polygon([(v['x'], v['z']) for v in polygon])
-    
-    # Inflate obstacles by keepout distance
-    obstacle_buffers = []
-    if obstacles:
-        for obs in obstacles:
-            if len(obs) >= 3:
-                try:
-                    obs_poly = Polygon([(v['x'], v['z']) for v in obs])
-                    if obs_poly.is_valid:
-                        buffered = obs_poly.buffer(keepout_m)
-                        obstacle_buffers.append(buffered)
-                except:
-                    pass
-    
-    obstacle_union = unary_union(obstacle_buffers) if obstacle_buffers else None
+    poly = Polygon(verts)
+    shapely.prepare(poly)
+    
+    # Inflate the merged obstacles by keepout distance
+    keepout_zone = None
+    if obstacle_union:
+        keepout_zone = obstacle_union.buffer(keepout_m)
+        shapely.prepare(keepout_zone)
     
     # Determine yaw candidates
     if model.hfov_deg >= 360 or model.dome_mode:
-        yaw_angles = [0.0]
+        yaw_angles = np.array([0.0])
     else:
         yaw_step = 30.0  # Default step
-        yaw_angles = list(np.arange(0, 360, yaw_step))
+        yaw_angles = np.arange(0, 360, yaw_step)
     
-    candidates = []
-    idx = 0
+    gx, gz = np.meshgrid(
+        grid_axis(min_x, max_x, spacing_m),
+        grid_axis(min_z, max_z, spacing_m),
+        indexing='ij'
+    )
+    gx, gz = gx.ravel(), gz.ravel()
     
-    x = min_x + spacing_m / 2
-    while x <= max_x:
-        z = min_z + spacing_m / 2
-        while z <= max_z:
-            pt = Point(x, z)
-            
-            # Check if inside polygon and not in obstacle keepout zone
-            if poly.contains(pt):
-                valid = True
-                if obstacle_union and obstacle_union.contains(pt):
-                    valid = False
-                
-                if valid:
-                    for yaw in yaw_angles:
-                        candidates.append(Candidate(idx=idx, x=x, z=z, yaw_deg=yaw))
-                        idx += 1
-            
-            z += spacing_m
-        x += spacing_m
+    # Check if inside polygon and not in obstacle keepout zone
+    valid = shapely.contains_xy(poly, gx, gz)
+    if keepout_zone is not None:
+        valid &= ~shapely.contains_xy(keepout_zone, gx, gz)
     
-    return candidates
+    n_positions = int(np.count_nonzero(valid))
+    n_yaws = len(yaw_angles)
+    return Candidates(
+        xs=np.repeat(gx[valid], n_yaws),
+        zs=np.repeat(gz[valid], n_yaws),
+        yaws=np.tile(yaw_angles, n_positions),
+        position_ids=np.repeat(np.arange(n_positions), n_yaws)
+    )
 
 
 def smallest_angle_diff(a: float, b: float) -> float:
@@ -268,42 +436,45 @@ def check_los_blocked(
     grid_bounds: Optional[Dict],
     cell_size: float
 ) -> bool:
-    """Check if line of sight is blocked by obstacles using ray marching."""
+    """Check if line of sight is blocked by obstacles using a DDA grid traversal."""
     if obstacle_grid is None:
         return False
     
-    dx = px - cx
-    dz = pz - cz
-    dist = math.sqrt(dx * dx + dz * dz)
-    if dist < 0.01:
-        return False
-    
-    steps = int(dist / (cell_size * 0.5)) + 1
-    for i in range(1, steps):
-        t = i / steps
-        x = cx + dx * t
-        z = cz + dz * t
-        
-        col = int((x - grid_bounds['min_x']) / cell_size)
-        row = int((z - grid_bounds['min_z']) / cell_size)
-        
-        if 0 <= row < obstacle_grid.shape[0] and 0 <= col < obstacle_grid.shape[1]:
-            if obstacle_grid[row, col]:
-                return True
-    
-    return False
+    blocked = los_blocked_pairs(
+        np.array([cx], dtype=np.float64), np.array([cz], dtype=np.float64),
+        np.array([px], dtype=np.float64), np.array([pz], dtype=np.float64),
+        obstacle_grid, grid_bounds, cell_size
+    )
+    return bool(blocked[0])
+
+
+def los_blocked_pairs(
+    x0: np.ndarray, z0: np.ndarray,
+    x1: np.ndarray, z1: np.ndarray,
+    obstacle_grid: np.ndarray,
+    grid_bounds: Dict,
+    cell_size: float
+) -> np.ndarray:
+    """
+    Batched check_los_blocked: trace the ray from (x0[k], z0[k]) to
+    (x1[k], z1[k]) for every k and return a bool array, True where it is blocked.
+    See _kernels.los_pairs for the traversal rules.
+    """
+    return los_pairs(
+        x0, z0, x1, z1, pack_grid_bits(obstacle_grid), obstacle_grid.shape[1],
+        grid_bounds['min_x'], grid_bounds['min_z'], cell_size
+    )
 
 
 def build_obstacle_grid(
-    polygon: List[Dict],
-    obstacles: List[List[Dict]],
+    polygon: PolygonLike,
+    obstacle_union: Optional[BaseGeometry],
     cell_size: float
 ) -> Tuple[np.ndarray, Dict]:
     """Build occupancy grid for LOS checking."""
-    xs = [v['x'] for v in polygon]
-    zs = [v['z'] for v in polygon]
-    min_x, max_x = min(xs), max(xs)
-    min_z, max_z = min(zs), max(zs)
+    verts = _poly_to_array(polygon)
+    min_x, min_z = verts.min(axis=0)
+    max_x, max_z = verts.max(axis=0)
     
     width = int((max_x - min_x) / cell_size) + 1
     height = int((max_z - min_z) / cell_size) + 1
@@ -311,26 +482,235 @@ def build_obstacle_grid(
     grid = np.zeros((height, width), dtype=bool)
     bounds = {'min_x': min_x, 'max_x': max_x, 'min_z': min_z, 'max_z': max_z}
     
-    # Mark obstacle cells
-    for obs in obstacles:
-        if len(obs) >= 3:
-            obs_poly = Polygon([(v['x'], v['z']) for v in obs])
-            if not obs_poly.is_valid:
-                continue
-            
-            for row in range(height):
-                for col in range(width):
-                    cx = min_x + (col + 0.5) * cell_size
-                    cz = min_z + (row + 0.5) * cell_size
-                    if obs_poly.contains(Point(cx, cz)):
-                        grid[row, col] = True
+    # Mark obstacle cells: test every cell center against the merged
+    # obstacles in a single vectorized GEOS call
+    if obstacle_union:
+        centers_x = min_x + (np.arange(width) + 0.5) * cell_size
+        centers_z = min_z + (np.arange(height) + 0.5) * cell_size
+        gx, gz = np.meshgrid(centers_x, centers_z)
+        grid = shapely.contains_xy(obstacle_union, gx, gz)
     
     return grid, bounds
 
 
+# Below this many sample points a brute-force (C, P) distance mask is
+# cheaper than bucketing the points into a spatial hash.
+SPATIAL_HASH_MIN_POINTS = 512
+
+
+def points_in_range(
+    cand_xz: np.ndarray,
+    pts_xz: np.ndarray,
+    r_eff: float
+) -> List[np.ndarray]:
+    """
+    For each candidate position, return the (ascending) indices of the
+    sample points within r_eff.
+
+    Large point sets are bucketed into a uniform grid with cells of size
+    r_eff, so each candidate only runs the exact squared-distance test on
+    points in its own and the 8 neighboring cells. Small ones use a dense
+    (C, P) mask.
+    """
+    r2 = r_eff * r_eff
+    
+    if len(pts_xz) < SPATIAL_HASH_MIN_POINTS or r_eff <= 0:
+        dx = pts_xz[None, :, 0] - cand_xz[:, None, 0]
+        dz = pts_xz[None, :, 1] - cand_xz[:, None, 1]
+        return list(np.flatnonzero(row) for row in dx * dx + dz * dz <= r2)
+    
+    # Slightly oversized cells so rounding can never push an in-range
+    # point beyond the 3x3 neighborhood
+    cell = r_eff * (1 + 1e-9)
+    origin = pts_xz.min(axis=0)
+    
+    # CSR bucket layout: points sorted by cell id (column-major, gx * n_z + gz),
+    # so cell c holds sample_idx[cell_start[c]:cell_start[c + 1]]
+    pt_cells = np.floor((pts_xz - origin) / cell).astype(np.int64)
+    n_x, n_z = pt_cells.max(axis=0) + 1
+    cell_id = pt_cells[:, 0] * n_z + pt_cells[:, 1]
+    sample_idx = np.argsort(cell_id, kind='stable')
+    cell_start = np.searchsorted(cell_id[sample_idx], np.arange(n_x * n_z + 1))
+    
+    empty = np.empty(0, dtype=np.int64)
+    cand_cells = np.floor((cand_xz - origin) / cell).astype(np.int64).tolist()
+    result = []
+    for (cx, cz), (gx, gz) in zip(cand_xz.tolist(), cand_cells):
+        # The 3 cells of each neighboring column are contiguous in cell id
+        z_lo, z_hi = max(gz - 1, 0), min(gz + 1, n_z - 1)
+        near = [
+            sample_idx[cell_start[col * n_z + z_lo]:cell_start[col * n_z + z_hi + 1]]
+            for col in range(max(gx - 1, 0), min(gx + 1, n_x - 1) + 1)
+        ] if z_lo <= z_hi else []
+        near = np.sort(np.concatenate(near)) if near else empty
+        if near.size == 0:
+            result.append(empty)
+            continue
+        
+        dx = pts_xz[near, 0] - cx
+        dz = pts_xz[near, 1] - cz
+        result.append(near[dx * dx + dz * dz <= r2])
+    
+    return result
+
+
+def pack_coverage_rows(covered_sets: List[np.ndarray], n_points: int) -> np.ndarray:
+    """
+    Pack each row of positions into the points list into a uint64 bitset
+    (bit i = points[i]), giving (len(covered_sets), W). Each row's positions
+    must be ascending, so the bits landing in one word are contiguous and
+    OR-reduce in a single reduceat.
+    """
+    n_words = (n_points + 63) // 64
+    bits = np.zeros((len(covered_sets), n_words), dtype=np.uint64)
+    lengths = np.fromiter((len(cov) for cov in covered_sets), np.int64, len(covered_sets))
+    positions = np.concatenate(list(covered_sets) + [np.empty(0, dtype=np.int64)]).astype(np.int64)
+    if positions.size == 0:
+        return bits
+    
+    word = np.repeat(np.arange(len(covered_sets)) * n_words, lengths) + (positions >> 6)
+    bit = np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+    starts = np.flatnonzero(np.concatenate([[True], word[1:] != word[:-1]]))
+    bits.ravel()[word[starts]] = np.bitwise_or.reduceat(bit, starts)
+    return bits
+
+
+def unpack_coverage_bits(bits: np.ndarray, n_points: int) -> np.ndarray:
+    """Unpack (..., W) uint64 bitsets into (..., n_points) 0/1 uint8 arrays."""
+    return np.unpackbits(bits.view(np.uint8), axis=-1, count=n_points, bitorder='little')
+
+
+def popcount64(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each word of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    # SWAR popcount for NumPy < 2.0
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def coverage_rows(
+    indices: List[int],
+    candidates: Candidates,
+    n_points: int
+) -> np.ndarray:
+    """(len(indices), n_points) int32 matrix of per-point coverage for the given candidates."""
+    bits = candidates.cov_bits[np.asarray(indices, dtype=np.int64)]
+    return unpack_coverage_bits(bits, n_points).astype(np.int32)
+
+
+def coverage_levels(bits: np.ndarray, k: int) -> List[np.ndarray]:
+    """
+    Saturating per-point coverage counters over packed rows, one row per
+    sensor: levels[j] has a point's bit set once at least j + 1 rows cover
+    it. For k = 2 these are the covered-once and covered-twice bitsets.
+    """
+    levels = [np.zeros(bits.shape[1], dtype=np.uint64) for _ in range(k)]
+    for row in bits:
+        for j in range(k - 1, 0, -1):
+            levels[j] |= levels[j - 1] & row
+        levels[0] |= row
+    return levels
+
+
+def coverage_csr(candidates: Candidates) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Candidate -> point incidence in CSR form: candidate c covers the points
+    indices[indptr[c]:indptr[c + 1]].
+    """
+    lengths = np.fromiter((len(cov) for cov in candidates.covered), np.int64, len(candidates))
+    indptr = np.zeros(len(candidates) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.concatenate(candidates.covered + [np.empty(0, dtype=np.int64)]).astype(np.int64)
+    return indptr, indices
+
+
+def _csr_transpose(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    n_cols: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR (indptr, indices) of the transposed incidence, rows in ascending order per column."""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.argsort(indices, kind='stable')
+    t_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_cols), out=t_indptr[1:])
+    return t_indptr, rows[order]
+
+
+def _csr_gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Concatenated column indices of the given CSR rows."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(offsets.size)]
+
+
+def _coverage_dome(
+    pos_of_cand: np.ndarray,
+    in_range: List[np.ndarray]
+) -> List[np.ndarray]:
+    """Dome / 360° coverage is the range test alone."""
+    return [in_range[pos] for pos in pos_of_cand]
+
+
+def _coverage_sector(
+    yaws: np.ndarray,
+    pos_of_cand: np.ndarray,
+    pos_xz: np.ndarray,
+    pts_xz: np.ndarray,
+    in_range: List[np.ndarray],
+    cos_half_hfov: float
+) -> List[np.ndarray]:
+    """
+    Range test followed by the HFOV wedge test around each candidate's yaw.
+    
+    A point is inside the wedge when the unit bearing to it, dotted with the
+    yaw's forward vector, is at least cos(hfov/2). Candidates are tested in
+    parallel by wedge_filter against their position's in-range points.
+    """
+    yaw_rad = np.radians(yaws)
+    pos_indptr = np.zeros(len(in_range) + 1, dtype=np.int64)
+    np.cumsum([len(near) for near in in_range], out=pos_indptr[1:])
+    
+    indptr, indices = wedge_filter(
+        pos_indptr, np.concatenate(in_range),
+        pts_xz[:, 0], pts_xz[:, 1], pos_xz[:, 0], pos_xz[:, 1],
+        pos_of_cand, np.cos(yaw_rad), np.sin(yaw_rad), cos_half_hfov
+    )
+    return np.split(indices, indptr[1:-1])
+
+
+def _filter_los(
+    in_range: List[np.ndarray],
+    pos_xz: np.ndarray,
+    pts_xz: np.ndarray,
+    obstacle_grid: np.ndarray,
+    grid_bounds: Dict,
+    los_cell_m: float
+) -> List[np.ndarray]:
+    """
+    Drop occluded points from every position's in-range set. Visibility does
+    not depend on yaw, so each (position, point) ray is traced once for all
+    yaw candidates, in a single los_blocked_pairs call.
+    """
+    counts = np.array([len(near) for near in in_range])
+    pair_pos = np.repeat(np.arange(len(in_range)), counts)
+    pair_pt = np.concatenate(in_range)
+    blocked = los_blocked_pairs(
+        pos_xz[pair_pos, 0], pos_xz[pair_pos, 1],
+        pts_xz[pair_pt, 0], pts_xz[pair_pt, 1],
+        obstacle_grid, grid_bounds, los_cell_m
+    )
+    visible_counts = counts - np.bincount(pair_pos[blocked], minlength=len(in_range))
+    return np.split(pair_pt[~blocked], np.cumsum(visible_counts)[:-1])
+
+
 def compute_coverage_sets(
-    candidates: List[Candidate],
-    points: List[SamplePoint],
+    candidates: Candidates,
+    points: SamplePoints,
     model: LidarModel,
     r_eff: float,
     los_enabled: bool,
@@ -340,36 +720,110 @@ def compute_coverage_sets(
 ) -> None:
     """
     Precompute which points each candidate covers.
-    Updates candidate.covered_points in place.
-    """
-    for c in candidates:
-        c.covered_points = []
-        for p in points:
-            dx = p.x - c.x
-            dz = p.z - c.z
-            dist = math.sqrt(dx * dx + dz * dz)
-            
-            # Range constraint
-            if dist > r_eff:
-                continue
-            
-            # HFOV constraint
-            if model.hfov_deg < 360 and not model.dome_mode:
-                angle_to_p = math.degrees(math.atan2(dz, dx))
-                if smallest_angle_diff(angle_to_p, c.yaw_deg) > model.hfov_deg / 2:
-                    continue
-            
-            # LOS constraint
-            if los_enabled and obstacle_grid is not None:
-                if check_los_blocked(c.x, c.z, p.x, p.z, obstacle_grid, grid_bounds, los_cell_m):
-                    continue
-            
-            c.covered_points.append(p.idx)
+    Sets candidates.covered and candidates.cov_bits.
+
+    Points in range of each candidate position are found with
+    points_in_range and, when LOS is enabled, filtered to those visible from
+    the position. Dome / 360° models stop there; sector models add the HFOV
+    test per yaw.
+    """
+    if len(candidates) == 0 or len(points) == 0:
+        candidates.covered = [np.empty(0, dtype=np.int64) for _ in range(len(candidates))]
+        candidates.cov_bits = pack_coverage_rows(candidates.covered, len(points))
+        return
+    
+    pts_xz = points.xz
+    
+    # Range and LOS constraints, once per position: the yaw candidates
+    # generated at a position all share the same visible in-range points
+    pos_xz, pos_of_cand = np.unique(candidates.xz, axis=0, return_inverse=True)
+    pos_of_cand = pos_of_cand.ravel()
+    in_range = points_in_range(pos_xz, pts_xz, r_eff)
+    
+    if los_enabled and obstacle_grid is not None:
+        in_range = _filter_los(
+            in_range, pos_xz, pts_xz, obstacle_grid, grid_bounds, los_cell_m
+        )
+    
+    if model.hfov_deg < 360 and not model.dome_mode:
+        covered_sets = _coverage_sector(
+            candidates.yaws, pos_of_cand, pos_xz, pts_xz, in_range, model.cos_half_hfov
+        )
+    else:
+        covered_sets = _coverage_dome(pos_of_cand, in_range)
+    
+    candidates.covered = list(covered_sets)
+    candidates.cov_bits = pack_coverage_rows(candidates.covered, len(points))
+
+
+def required_coverage(points: SamplePoints, settings: PlannerSettings) -> np.ndarray:
+    """
+    Per-point coverage a placement must keep: k_required everywhere, k_required
+    on critical points and 1 elsewhere, or 1 for percent_target.
+    """
+    if settings.overlap_mode == "everywhere":
+        return np.full(len(points), settings.k_required, dtype=np.int32)
+    if settings.overlap_mode == "critical_only":
+        return np.where(points.is_critical, settings.k_required, 1).astype(np.int32)
+    # percent_target - just check 1-coverage
+    return np.ones(len(points), dtype=np.int32)
+
+
+def greedy_k_cover(
+    candidates: Candidates,
+    points: SamplePoints,
+    settings: PlannerSettings
+) -> Tuple[List[int], bool]:
+    """
+    Greedy k-cover used to warm-start CP-SAT: repeatedly pick the candidate
+    covering the most points that still need coverage.
+    
+    Returns the selected candidate indices and whether the selection
+    satisfies every coverage constraint of solve_k_coverage.
+    """
+    n_points = len(points)
+    indptr, indices = coverage_csr(candidates)
+    n_coverers = np.bincount(indices, minlength=n_points)
+    coverable = n_coverers > 0
+    
+    if settings.overlap_mode == "percent_target":
+        # k-cover everything we can; that meets the target whenever it is reachable
+        required = np.full(len(points), settings.k_required, dtype=np.int32)
+        target_count = int(settings.overlap_target_pct * len(points))
+        feasible = np.count_nonzero(n_coverers >= settings.k_required) >= target_count
+    else:
+        required = required_coverage(points, settings)
+        feasible = bool(np.all(n_coverers[coverable] >= required[coverable]))
+    
+    # Points nobody covers are unconstrained in the model. A candidate's gain
+    # is the number of its points still needing coverage; when a point is
+    # satisfied, the transposed incidence gives the candidates whose gain drops.
+    need = np.minimum(required, n_coverers)
+    needy_prefix = np.concatenate([[0], np.cumsum(need[indices] > 0)])
+    gains = needy_prefix[indptr[1:]] - needy_prefix[indptr[:-1]]
+    t_indptr, t_indices = _csr_transpose(indptr, indices, n_points)
+    
+    selected = []
+    while gains.max() > 0:
+        best = int(np.argmax(gains))
+        selected.append(best)
+        
+        covered = indices[indptr[best]:indptr[best + 1]]
+        hit = covered[need[covered] > 0]
+        need[hit] -= 1
+        satisfied = hit[need[hit] == 0]
+        if satisfied.size:
+            gains -= np.bincount(
+                _csr_gather(t_indptr, t_indices, satisfied), minlength=len(gains)
+            )
+        gains[best] = -1
+    
+    return selected, feasible
 
 
 def solve_k_coverage(
-    candidates: List[Candidate],
-    points: List[SamplePoint],
+    candidates: Candidates,
+    points: SamplePoints,
     settings: PlannerSettings
 ) -> Tuple[List[int], str, bool]:
     """
@@ -379,26 +833,38 @@ def solve_k_coverage(
     model = cp_model.CpModel()
     
     # Variables: x_c for each candidate (1 if selected, 0 otherwise)
-    x = {}
-    for c in candidates:
-        x[c.idx] = model.NewBoolVar(f'x_{c.idx}')
+    x = [model.NewBoolVar(f'x_{c_idx}') for c_idx in range(len(candidates))]
+    
+    # Symmetry breaking: candidates with identical coverage are
+    # interchangeable, so only allow selecting them in index order.
+    # Candidates that cover nothing can never help.
+    coverage_classes: Dict[bytes, List[int]] = {}
+    for c_idx, bits in enumerate(candidates.cov_bits):
+        coverage_classes.setdefault(bits.tobytes(), []).append(c_idx)
+    for cov_key, group in coverage_classes.items():
+        if not any(cov_key):
+            for c_idx in group:
+                model.Add(x[c_idx] == 0)
+            continue
+        for a, b in zip(group, group[1:]):
+            model.Add(x[a] >= x[b])
     
     # Build point -> covering candidates map
-    point_covers: Dict[int, List[int]] = {p.idx: [] for p in points}
-    for c in candidates:
-        for p_idx in c.covered_points:
-            point_covers[p_idx].append(c.idx)
+    point_covers: List[List[int]] = [[] for _ in range(len(points))]
+    for c_idx, covered in enumerate(candidates.covered):
+        for p_idx in covered.tolist():
+            point_covers[p_idx].append(c_idx)
     
     # Constraints based on overlap mode
-    critical_indices = {p.idx for p in points if p.is_critical}
-    all_indices = {p.idx for p in points}
+    critical_indices = set(np.flatnonzero(points.is_critical).tolist())
+    all_indices = range(len(points))
     
     if settings.overlap_mode == "everywhere":
         # All points need k-coverage
         for p_idx in all_indices:
             covering = point_covers[p_idx]
             if covering:
-                model.Add(sum(x[c_idx] for c_idx in covering) >= settings.k_required)
+                model.Add(cp_model.LinearExpr.Sum([x[c_idx] for c_idx in covering]) >= settings.k_required)
             else:
                 # Point cannot be covered - make constraint relaxable
                 pass
@@ -410,99 +876,146 @@ def solve_k_coverage(
             if not covering:
                 continue
             if p_idx in critical_indices:
-                model.Add(sum(x[c_idx] for c_idx in covering) >= settings.k_required)
+                model.Add(cp_model.LinearExpr.Sum([x[c_idx] for c_idx in covering]) >= settings.k_required)
             else:
-                model.Add(sum(x[c_idx] for c_idx in covering) >= 1)
+                model.Add(cp_model.LinearExpr.Sum([x[c_idx] for c_idx in covering]) >= 1)
     
     elif settings.overlap_mode == "percent_target":
         # At least overlap_target_pct of points need k-coverage
         # All points need at least 1-coverage
         y = {}  # y_p = 1 if point p is k-covered
-        for p in points:
-            covering = point_covers[p.idx]
+        for p_idx in all_indices:
+            covering = point_covers[p_idx]
             if not covering:
                 continue
             
+            coverage = cp_model.LinearExpr.Sum([x[c_idx] for c_idx in covering])
+            
             # 1-coverage for all
-            model.Add(sum(x[c_idx] for c_idx in covering) >= 1)
+            model.Add(coverage >= 1)
             
             # k-coverage indicator
-            y[p.idx] = model.NewBoolVar(f'y_{p.idx}')
+            y[p_idx] = model.NewBoolVar(f'y_{p_idx}')
             # y_p => sum >= k_required
-            model.Add(sum(x[c_idx] for c_idx in covering) >= settings.k_required).OnlyEnforceIf(y[p.idx])
+            model.Add(coverage >= settings.k_required).OnlyEnforceIf(y[p_idx])
         
         # At least target% of points must be k-covered
         target_count = int(settings.overlap_target_pct * len(points))
         if y:
-            model.Add(sum(y.values()) >= target_count)
+            model.Add(cp_model.LinearExpr.Sum(list(y.values())) >= target_count)
     
     # Objective: minimize number of sensors
-    model.Minimize(sum(x.values()))
+    num_selected = cp_model.LinearExpr.Sum(x)
+    model.Minimize(num_selected)
+    
+    # Warm start from a greedy cover; when it is feasible its size also
+    # bounds the optimum, so worse branches can be cut immediately
+    greedy_selected, greedy_feasible = greedy_k_cover(candidates, points, settings)
+    greedy_set = set(greedy_selected)
+    for c_idx, var in enumerate(x):
+        model.AddHint(var, 1 if c_idx in greedy_set else 0)
+    if greedy_feasible:
+        model.Add(num_selected <= len(greedy_selected))
     
     # Solve
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = settings.solver_time_limit_s
     solver.parameters.random_seed = settings.seed
+    solver.parameters.cp_model_presolve = True
+    if settings.deterministic:
+        # Parallel portfolio search is not reproducible run to run
+        solver.parameters.num_workers = 1
+    else:
+        solver.parameters.num_workers = settings.num_workers or min(8, solver_cpus())
     
     status = solver.Solve(model)
     
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        selected = [c.idx for c in candidates if solver.Value(x[c.idx]) == 1]
+        selected = [c_idx for c_idx, var in enumerate(x) if solver.Value(var) == 1]
         status_str = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
         return selected, status_str, True
     else:
         return [], solver.StatusName(status), False
 
 
+def solve_seed_portfolio(
+    candidates: Candidates,
+    points: SamplePoints,
+    settings: PlannerSettings
+) -> Tuple[List[int], str, bool]:
+    """
+    Run solve_k_coverage with seeds seed .. seed+N-1 in parallel threads,
+    each single-worker with the full time limit, where N is seed_portfolio
+    capped at solver_cpus() so that every run gets a CPU and the portfolio
+    takes the wall time of one solve. Returns an OPTIMAL result if any run
+    proves one, otherwise the smallest FEASIBLE selection (ties go to the
+    lowest seed).
+    """
+    runs = []
+    for i in range(min(settings.seed_portfolio, solver_cpus())):
+        run_settings = PlannerSettings(**settings.__dict__)
+        run_settings.seed = settings.seed + i
+        run_settings.deterministic = True
+        runs.append(run_settings)
+    
+    # Threads rather than processes: CpSolver.Solve releases the GIL, and the
+    # server already runs this inside a (daemonic) pool process, which may
+    # not start children of its own
+    with ThreadPoolExecutor(max_workers=len(runs)) as pool:
+        results = list(pool.map(
+            solve_k_coverage,
+            [candidates] * len(runs), [points] * len(runs), runs
+        ))
+    
+    solved = [r for r in results if r[2]]
+    if not solved:
+        return [], results[0][1] if results else "UNKNOWN", False
+    return min(solved, key=lambda r: (r[1] != "OPTIMAL", len(r[0])))
+
+
+def solve_coverage(
+    candidates: Candidates,
+    points: SamplePoints,
+    settings: PlannerSettings
+) -> Tuple[List[int], str, bool]:
+    """solve_k_coverage, or a seed portfolio in its place when seed_portfolio > 1."""
+    if settings.seed_portfolio > 1:
+        return solve_seed_portfolio(candidates, points, settings)
+    return solve_k_coverage(candidates, points, settings)
+
+
 def prune_redundant_sensors(
     selected_indices: List[int],
-    candidates: List[Candidate],
-    points: List[SamplePoint],
+    candidates: Candidates,
+    points: SamplePoints,
     settings: PlannerSettings
 ) -> List[int]:
     """
     Remove redundant sensors while maintaining coverage constraints.
     """
-    candidate_map = {c.idx: c for c in candidates}
     selected = set(selected_indices)
+    order = list(selected)
+    
+    required = required_coverage(points, settings)
+    
+    # Running per-point coverage count of the selected sensors
+    rows = coverage_rows(order, candidates, len(points))
+    total = rows.sum(axis=0)
     
     # Try removing each sensor
-    for idx in list(selected):
-        # Temporarily remove
-        test_selected = selected - {idx}
-        
-        # Check if constraints still satisfied
-        coverage_count = {p.idx: 0 for p in points}
-        for c_idx in test_selected:
-            for p_idx in candidate_map[c_idx].covered_points:
-                coverage_count[p_idx] += 1
-        
-        valid = True
-        for p in points:
-            if settings.overlap_mode == "everywhere":
-                if coverage_count[p.idx] < settings.k_required:
-                    valid = False
-                    break
-            elif settings.overlap_mode == "critical_only":
-                req = settings.k_required if p.is_critical else 1
-                if coverage_count[p.idx] < req:
-                    valid = False
-                    break
-            else:  # percent_target - just check 1-coverage
-                if coverage_count[p.idx] < 1:
-                    valid = False
-                    break
-        
-        if valid:
-            selected = test_selected
+    for idx, row in zip(order, rows):
+        remaining = total - row
+        if np.all(remaining >= required):
+            selected.discard(idx)
+            total = remaining
     
     return list(selected)
 
 
 def refine_yaw_angles(
     selected_indices: List[int],
-    candidates: List[Candidate],
-    points: List[SamplePoint],
+    candidates: Candidates,
+    points: SamplePoints,
     model: LidarModel,
     r_eff: float
 ) -> Dict[int, float]:
@@ -510,55 +1023,41 @@ def refine_yaw_angles(
     For partial HFOV sensors, optimize yaw to maximize coverage.
     Returns map of candidate index to refined yaw.
     """
-    if model.hfov_deg >= 360 or model.dome_mode:
+    if model.hfov_deg >= 360 or model.dome_mode or not selected_indices:
         return {}
     
-    refined_yaw = {}
-    candidate_map = {c.idx: c for c in candidates}
-    
-    # Group candidates by position
-    positions = {}
-    for idx in selected_indices:
-        c = candidate_map[idx]
-        key = (round(c.x, 4), round(c.z, 4))
-        if key not in positions:
-            positions[key] = []
-        positions[key].append(c)
-    
-    # For each position, find best yaw
-    for pos, pos_candidates in positions.items():
-        best_yaw = pos_candidates[0].yaw_deg
-        best_coverage = len(pos_candidates[0].covered_points)
-        
-        for c in pos_candidates:
-            if len(c.covered_points) > best_coverage:
-                best_coverage = len(c.covered_points)
-                best_yaw = c.yaw_deg
-        
-        for c in pos_candidates:
-            refined_yaw[c.idx] = best_yaw
+    # Group the selected candidates by position. Sorting by (position, most
+    # points covered, selection order) puts each position's best yaw first,
+    # the earliest selected one on ties.
+    selected = np.asarray(selected_indices, dtype=np.int64)
+    cov_count = np.fromiter(
+        (len(candidates.covered[idx]) for idx in selected_indices), np.int64, len(selected)
+    )
+    _, group = np.unique(np.round(candidates.xz[selected], 4), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    order = np.lexsort((np.arange(len(selected)), -cov_count, group))
+    sorted_group = group[order]
+    first = np.flatnonzero(np.concatenate([[True], sorted_group[1:] != sorted_group[:-1]]))
+    best_yaw = candidates.yaws[selected[order[first]]]
+    refined_yaw = dict(zip(selected_indices, best_yaw[group].tolist()))
     
     return refined_yaw
 
 
 def compute_coverage_stats(
     selected_indices: List[int],
-    candidates: List[Candidate],
-    points: List[SamplePoint],
+    candidates: Candidates,
+    points: SamplePoints,
     k_required: int
 ) -> Tuple[float, float]:
     """Compute coverage and k-coverage percentages."""
-    candidate_map = {c.idx: c for c in candidates}
-    coverage_count = {p.idx: 0 for p in points}
-    
-    for idx in selected_indices:
-        for p_idx in candidate_map[idx].covered_points:
-            coverage_count[p_idx] += 1
+    total = len(points)
+    bits = candidates.cov_bits[np.asarray(selected_indices, dtype=np.int64)]
+    levels = coverage_levels(bits, max(k_required, 1))
     
-    covered = sum(1 for c in coverage_count.values() if c >= 1)
-    k_covered = sum(1 for c in coverage_count.values() if c >= k_required)
+    covered = int(popcount64(levels[0]).sum())
+    k_covered = int(popcount64(levels[k_required - 1]).sum()) if k_required >= 1 else total
     
-    total = len(points)
     coverage_pct = covered / total if total > 0 else 0
     k_coverage_pct = k_covered / total if total > 0 else 0
     
@@ -604,7 +1103,10 @@ def solve_lidar_placement(params: Dict) -> Dict:
             yaw_step_deg=settings_params.get('yaw_step_deg', 30.0),
             max_sensors=settings_params.get('max_sensors', 50),
             solver_time_limit_s=settings_params.get('solver_time_limit_s', 10.0),
-            seed=settings_params.get('seed', 42)
+            seed=settings_params.get('seed', 42),
+            num_workers=settings_params.get('num_workers', 0),
+            deterministic=settings_params.get('deterministic', False),
+            seed_portfolio=settings_params.get('seed_portfolio', 0)
         )
         
         if len(roi_polygon) < 3:
@@ -615,6 +1117,10 @@ def solve_lidar_placement(params: Dict) -> Dict:
                 'num_sensors': 0
             }
         
+        # Vertex dicts are converted once here; everything below takes the
+        # prepared polygon
+        roi = PreparedPolygon(roi_polygon)
+        
         # Compute effective radius
         r_eff = compute_effective_radius(model, settings.mount_y_m)
         
@@ -625,12 +1131,19 @@ def solve_lidar_placement(params: Dict) -> Dict:
         print(f"=== SOLVER DEBUG ===")
         print(f"r_eff: {r_eff:.2f}m, candidate_spacing: {candidate_spacing:.2f}m")
         
+        # One generator per solve instead of reseeding the global RNGs
+        rng = make_rng(settings.seed)
+        
+        # Obstacle geometry is built once and shared by sampling,
+        # candidate keepout and the LOS grid
+        obstacle_union = build_obstacle_union(obstacles)
+        
         # Sample points
         points = sample_points_in_polygon(
-            roi_polygon,
+            roi,
             settings.sample_spacing_m,
-            settings.seed,
-            obstacles
+            rng,
+            obstacle_union
         )
         
         if len(points) == 0:
@@ -647,12 +1160,12 @@ def solve_lidar_placement(params: Dict) -> Dict:
         
         # Generate candidates
         candidates = generate_candidates(
-            roi_polygon,
+            roi,
             candidate_spacing,
             settings.keepout_distance_m,
             model,
-            settings.seed,
-            obstacles
+            rng,
+            obstacle_union
         )
         
         if len(candidates) == 0:
@@ -666,9 +1179,9 @@ def solve_lidar_placement(params: Dict) -> Dict:
         # Build obstacle grid for LOS
         obstacle_grid = None
         grid_bounds = None
-        if settings.los_enabled and obstacles:
+        if settings.los_enabled and obstacle_union is not None:
             obstacle_grid, grid_bounds = build_obstacle_grid(
-                roi_polygon, obstacles, settings.los_cell_m
+                roi, obstacle_union, settings.los_cell_m
             )
         
         # Compute coverage sets
@@ -679,19 +1192,20 @@ def solve_lidar_placement(params: Dict) -> Dict:
         
         # Solve k-coverage problem
         warnings = []
-        selected_indices, solver_status, success = solve_k_coverage(
-            candidates, points, settings
+        solve_settings = settings
+        selected_indices, solver_status, success = solve_coverage(
+            candidates, points, solve_settings
         )
         
         # If infeasible, try relaxing constraints
         if not success:
             warnings.append(f"Initial solve failed ({solver_status}), relaxing to k=1")
-            relaxed_settings = PlannerSettings(**settings.__dict__)
-            relaxed_settings.k_required = 1
-            relaxed_settings.overlap_mode = "everywhere"
+            solve_settings = PlannerSettings(**settings.__dict__)
+            solve_settings.k_required = 1
+            solve_settings.overlap_mode = "everywhere"
             
-            selected_indices, solver_status, success = solve_k_coverage(
-                candidates, points, relaxed_settings
+            selected_indices, solver_status, success = solve_coverage(
+                candidates, points, solve_settings
             )
         
         if not success:
@@ -719,12 +1233,11 @@ def solve_lidar_placement(params: Dict) -> Dict:
         )
         
         # Build output positions
-        candidate_map = {c.idx: c for c in candidates}
         seen_positions = set()
         selected_positions = []
         
         for idx in selected_indices:
-            c = candidate_map[idx]
+            c = candidates[idx]
             pos_key = (round(c.x, 4), round(c.z, 4))
             if pos_key in seen_positions:
                 continue
@@ -14,7 +14,13 @@ else
     source venv/bin/activate
 fi
 
-# Start the server
+# Start the server (Gunicorn; each worker hands solves to its own process pool)
 export LIDAR_SOLVER_PORT=${LIDAR_SOLVER_PORT:-3002}
-echo "Starting LiDAR Solver on port $LIDAR_SOLVER_PORT"
-python server.py
+# The server sizes each worker's solver pool from LIDAR_SOLVER_WORKERS and
+# returns 504 after LIDAR_SOLVER_MAX_SOLVE_S, before Gunicorn kills the worker
+export LIDAR_SOLVER_WORKERS=${LIDAR_SOLVER_WORKERS:-2}
+export LIDAR_SOLVER_MAX_SOLVE_S=${LIDAR_SOLVER_MAX_SOLVE_S:-570}
+GUNICORN_TIMEOUT=$(( ${LIDAR_SOLVER_MAX_SOLVE_S%.*} + 30 ))
+echo "Starting LiDAR Solver on port $LIDAR_SOLVER_PORT ($LIDAR_SOLVER_WORKERS workers)"
+exec gunicorn --workers "$LIDAR_SOLVER_WORKERS" --threads 1 --timeout "$GUNICORN_TIMEOUT" \
+    --bind "0.0.0.0:$LIDAR_SOLVER_PORT" wsgi:app
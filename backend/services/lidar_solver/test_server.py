@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the LiDAR solver HTTP service.
+Tests request validation, the result cache, timeouts and the solver pool.
+"""
+
+import unittest
+import multiprocessing as mp
+import os
+from unittest import mock
+
+import server
+
+
+class _FakePending:
+    """AsyncResult stand-in: returns the result, or times out."""
+    
+    def __init__(self, result, timed_out):
+        self.result = result
+        self.timed_out = timed_out
+    
+    def get(self, timeout=None):
+        if self.timed_out:
+            raise mp.TimeoutError()
+        return self.result
+
+
+class _FakePool:
+    """Solver pool stand-in that runs solves inline in the test process."""
+    
+    def __init__(self, timed_out=False):
+        self.timed_out = timed_out
+        self.calls = 0
+        self.terminated = False
+    
+    def apply_async(self, func, args):
+        self.calls += 1
+        return _FakePending(None if self.timed_out else func(*args), self.timed_out)
+    
+    def terminate(self):
+        self.terminated = True
+
+
+class ServerTestCase(unittest.TestCase):
+    """Installs a fake solver pool and an empty result cache."""
+    
+    def setUp(self):
+        self.client = server.app.test_client()
+        self.saved_pool = server._pool
+        server._pool = self.pool = _FakePool()
+        server._result_cache.clear()
+    
+    def tearDown(self):
+        server._pool = self.saved_pool
+        server._result_cache.clear()
+
+
+class TestSolveRequests(ServerTestCase):
+    """Test request validation and timeouts of POST /solve."""
+    
+    def test_non_object_body_rejected(self):
+        """JSON bodies that are not objects should get a 400 without solving."""
+        for body in ([1, 2], 'roi', 5):
+            response = self.client.post('/solve', json=body)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.get_json()['success'])
+        self.assertEqual(self.pool.calls, 0)
+    
+    def test_timeout_resets_pool(self):
+        """A solve that times out should get a 504 and kill its pool."""
+        server._pool = pool = _FakePool(timed_out=True)
+        
+        response = self.client.post('/solve', json={'settings': {'solver_time_limit_s': 1}})
+        
+        self.assertEqual(response.status_code, 504)
+        self.assertFalse(response.get_json()['success'])
+        self.assertTrue(pool.terminated)
+        self.assertIsNone(server._pool)
+    
+    def test_solve_timeout_covers_retry(self):
+        """The request timeout should allow two solves plus the margin, up to the cap."""
+        self.assertEqual(server.solve_timeout_s(10), 20 + server.SOLVE_TIMEOUT_MARGIN_S)
+        self.assertEqual(server.solve_timeout_s(10 ** 6), server.MAX_SOLVE_S)
+
+
+class TestResultCache(ServerTestCase):
+    """Test the LRU cache of successful solves."""
+    
+    def test_repeat_request_hits_cache(self):
+        """A repeated request (in any key order) should be served without the pool."""
+        result = {'success': True, 'num_sensors': 3}
+        with mock.patch.object(server, 'solve_lidar_placement', return_value=result) as solve:
+            first = self.client.post('/solve', json={'seed': 1, 'settings': {'k_required': 2}})
+            second = self.client.post('/solve', json={'settings': {'k_required': 2}, 'seed': 1})
+        
+        self.assertEqual(first.headers['X-Solver-Cache'], 'miss')
+        self.assertEqual(second.headers['X-Solver-Cache'], 'hit')
+        self.assertEqual(second.get_json(), result)
+        self.assertEqual(solve.call_count, 1)
+        self.assertEqual(self.pool.calls, 1)
+    
+    def test_failed_result_not_cached(self):
+        """Unsuccessful solves should be solved again on repeat."""
+        result = {'success': False, 'error': 'ROI polygon must have at least 3 vertices'}
+        with mock.patch.object(server, 'solve_lidar_placement', return_value=result) as solve:
+            first = self.client.post('/solve', json={'roi_polygon': []})
+            second = self.client.post('/solve', json={'roi_polygon': []})
+        
+        self.assertEqual(first.headers['X-Solver-Cache'], 'miss')
+        self.assertEqual(second.headers['X-Solver-Cache'], 'miss')
+        self.assertEqual(solve.call_count, 2)
+        self.assertEqual(len(server._result_cache), 0)
+    
+    def test_lru_eviction_order(self):
+        """A full cache should evict the least recently used entry first."""
+        keys = [server.cache_key({'seed': i}) for i in range(server.RESULT_CACHE_SIZE + 1)]
+        for i, key in enumerate(keys[:-1]):
+            server.cache_put(key, {'success': True, 'seed': i})
+        self.assertIsNotNone(server.cache_get(keys[0]))  # now most recently used
+        
+        server.cache_put(keys[-1], {'success': True})
+        
+        self.assertEqual(len(server._result_cache), server.RESULT_CACHE_SIZE)
+        self.assertIsNone(server.cache_get(keys[1]))
+        self.assertIsNotNone(server.cache_get(keys[0]))
+        self.assertIsNotNone(server.cache_get(keys[2]))
+        self.assertIsNotNone(server.cache_get(keys[-1]))
+    
+    def test_solver_version_changes_key(self):
+        """Bumping SOLVER_VERSION should invalidate cached results."""
+        params = {'settings': {'seed': 42}}
+        key = server.cache_key(params)
+        with mock.patch.object(server, 'SOLVER_VERSION', server.SOLVER_VERSION + '.dev'):
+            self.assertNotEqual(server.cache_key(params), key)
+        self.assertEqual(server.cache_key(params), key)
+
+
+class TestSolverPool(unittest.TestCase):
+    """Test solves through the real process pool."""
+    
+    def setUp(self):
+        self.client = server.app.test_client()
+        self.saved_pool = server._pool
+        server._pool = None
+        server._result_cache.clear()
+    
+    def tearDown(self):
+        if server._pool is not None:
+            server._kill_pool(server._pool)
+        server._pool = self.saved_pool
+        server._result_cache.clear()
+    
+    def test_pool_uses_worker_share(self):
+        """The pool process should get the worker's whole CPU share for Numba."""
+        try:
+            import numba
+        except ImportError:
+            self.skipTest("numba not installed")
+        pool = server._get_pool()
+        self.assertEqual(pool.apply(os.getenv, ('LIDAR_SOLVER_CPUS',)), str(server.CPUS_PER_WORKER))
+        self.assertEqual(
+            pool.apply(numba.get_num_threads),
+            min(server.CPUS_PER_WORKER, numba.config.NUMBA_NUM_THREADS)
+        )
+    
+    def test_seed_portfolio_request(self):
+        """A seed portfolio should run inside the pool process end to end."""
+        params = {
+            'roi_polygon': [
+                {'x': 0, 'z': 0},
+                {'x': 8, 'z': 0},
+                {'x': 8, 'z': 8},
+                {'x': 0, 'z': 8}
+            ],
+            'model': {'hfov_deg': 360, 'vfov_deg': 60, 'range_m': 8, 'dome_mode': True},
+            'settings': {
+                'sample_spacing_m': 1.0,
+                'candidate_spacing_m': 4.0,
+                'k_required': 1,
+                'solver_time_limit_s': 2.0,
+                'seed_portfolio': 2
+            }
+        }
+        
+        response = self.client.post('/solve', json=params)
+        
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertGreater(result['num_sensors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
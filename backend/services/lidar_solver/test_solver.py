@@ -7,22 +7,34 @@ Tests effective radius, HFOV wedge, sampling, LOS, and solver feasibility.
 import unittest
 import math
 import json
+import os
+from unittest import mock
 from solver import (
     compute_effective_radius,
     point_in_polygon,
+    point_in_polygon_batch,
     sample_points_in_polygon,
     generate_candidates,
     smallest_angle_diff,
     check_los_blocked,
+    los_blocked_pairs,
     build_obstacle_grid,
     compute_coverage_sets,
+    unpack_coverage_bits,
+    popcount64,
+    greedy_k_cover,
     solve_lidar_placement,
     LidarModel,
     PlannerSettings,
     SamplePoint,
-    Candidate
+    SamplePoints,
+    Candidate,
+    Candidates
 )
 import numpy as np
+from ortools.sat.python import cp_model
+import _kernels
+import solver
 
 
 class TestEffectiveRadius(unittest.TestCase):
@@ -74,6 +86,24 @@ class TestHfovWedge(unittest.TestCase):
     def test_smallest_angle_diff_negative(self):
         """Test with negative angles."""
         self.assertAlmostEqual(smallest_angle_diff(-10, 10), 20, places=1)
+    
+    def test_coverage_wedge_matches_angle_diff(self):
+        """The dot-product wedge test should agree with smallest_angle_diff."""
+        rng = np.random.default_rng(4)
+        pts = rng.uniform(-5, 5, size=(300, 2))
+        points = SamplePoints(pts[:, 0], pts[:, 1])
+        yaws = np.arange(0, 360, 30.0)
+        candidates = Candidates(np.zeros(len(yaws)), np.zeros(len(yaws)), yaws)
+        model = LidarModel(hfov_deg=100, dome_mode=False)
+        compute_coverage_sets(candidates, points, model, 4.0, False, None, None, 0.25)
+        
+        for c in candidates:
+            expected = [
+                i for i, (x, z) in enumerate(pts)
+                if x * x + z * z <= 16.0
+                and smallest_angle_diff(math.degrees(math.atan2(z, x)), c.yaw_deg) <= 50
+            ]
+            self.assertEqual(c.covered_points, expected)
 
 
 class TestPointInPolygon(unittest.TestCase):
@@ -99,6 +129,49 @@ class TestPointInPolygon(unittest.TestCase):
         self.assertFalse(point_in_polygon(11, 5, self.square))
         self.assertFalse(point_in_polygon(5, -1, self.square))
         self.assertFalse(point_in_polygon(5, 11, self.square))
+    
+    def test_batch_matches_scalar_on_concave_polygon(self):
+        """Batched test should agree with the scalar test point by point."""
+        l_shape = [
+            {'x': 0, 'z': 0}, {'x': 10, 'z': 0}, {'x': 10, 'z': 4},
+            {'x': 4, 'z': 4}, {'x': 4, 'z': 10}, {'x': 0, 'z': 10}
+        ]
+        verts = np.array([(v['x'], v['z']) for v in l_shape], dtype=np.float64)
+        rng = np.random.default_rng(3)
+        xs = rng.uniform(-2, 12, 500)
+        zs = rng.uniform(-2, 12, 500)
+        
+        batch = point_in_polygon_batch(xs, zs, verts)
+        scalar = [point_in_polygon(x, z, l_shape) for x, z in zip(xs, zs)]
+        self.assertEqual(batch.tolist(), scalar)
+        self.assertFalse(point_in_polygon(7, 7, l_shape))
+    
+    def test_prepared_polygon_matches_kernel(self):
+        """Bounding box rejection should not change any PNPoly result."""
+        l_shape = [
+            {'x': 0, 'z': 0}, {'x': 10, 'z': 0}, {'x': 10, 'z': 4},
+            {'x': 4, 'z': 4}, {'x': 4, 'z': 10}, {'x': 0, 'z': 10}
+        ]
+        prepared = solver.PreparedPolygon(l_shape)
+        self.assertEqual(prepared.bbox, (0.0, 0.0, 10.0, 10.0))
+        
+        rng = np.random.default_rng(11)
+        xs, zs = rng.uniform(-5, 15, size=(2, 1000))
+        self.assertEqual(
+            prepared.contains(xs, zs).tolist(),
+            _kernels.pnpoly_batch(xs, zs, prepared.xy).tolist()
+        )
+        self.assertTrue(point_in_polygon(2, 2, prepared))
+    
+    def test_array_input_matches_dicts(self):
+        """Polygons may be passed as (N, 2) vertex arrays instead of dicts."""
+        verts = np.array([(v['x'], v['z']) for v in self.square], dtype=np.float64)
+        self.assertTrue(point_in_polygon(5, 5, verts))
+        self.assertFalse(point_in_polygon(11, 5, verts))
+        
+        from_dicts = sample_points_in_polygon(self.square, 1.0, 7)
+        from_array = sample_points_in_polygon(verts, 1.0, 7)
+        self.assertTrue(np.array_equal(from_dicts.xz, from_array.xz))
 
 
 class TestSamplingDeterminism(unittest.TestCase):
@@ -141,6 +214,29 @@ class TestSamplingDeterminism(unittest.TestCase):
         self.assertGreater(diffs, 0)
 
 
+class TestStructOfArrays(unittest.TestCase):
+    """Test the SamplePoints / Candidates array containers."""
+    
+    def test_item_views_match_arrays(self):
+        """Indexing should return rows built from the parallel arrays."""
+        polygon = [{'x': 0, 'z': 0}, {'x': 10, 'z': 0}, {'x': 10, 'z': 10}, {'x': 0, 'z': 10}]
+        points = sample_points_in_polygon(polygon, spacing_m=1.0, seed=1)
+        candidates = generate_candidates(
+            polygon, 5.0, 0.5, LidarModel(hfov_deg=90, dome_mode=False), 1, []
+        )
+        
+        self.assertEqual(len(list(points)), len(points))
+        self.assertEqual(points[-1].idx, len(points) - 1)
+        self.assertEqual(points[3].x, points.xs[3])
+        
+        n_yaws = len(candidates) // (candidates.position_ids[-1] + 1)
+        self.assertGreater(n_yaws, 1)
+        self.assertEqual(candidates[n_yaws].position_id, 1)
+        self.assertEqual(candidates[n_yaws + 1].yaw_deg, candidates.yaws[1])
+        with self.assertRaises(IndexError):
+            candidates[len(candidates)]
+
+
 class TestLosRaymarch(unittest.TestCase):
     """Test line-of-sight ray marching."""
     
@@ -169,6 +265,310 @@ class TestLosRaymarch(unittest.TestCase):
         # Ray from (5,5) to (5,0) should not be blocked
         blocked = check_los_blocked(5, 5, 5, 0, grid, bounds, 1.0)
         self.assertFalse(blocked)
+    
+    def test_traversal_catches_corner_clip(self):
+        """A ray that only clips the corner of an obstacle cell is blocked."""
+        grid = np.zeros((10, 10), dtype=bool)
+        grid[1, 2] = True
+        bounds = {'min_x': 0, 'max_x': 10, 'min_z': 0, 'max_z': 10}
+        
+        # Crosses z=1 at x~2.98, so it enters cell (row 1, col 2) just
+        # before moving on to col 3
+        blocked = check_los_blocked(0.5, 0.5, 5.5, 1.508, grid, bounds, 1.0)
+        self.assertTrue(blocked)
+    
+    @staticmethod
+    def _segment_hits_cell(x0, z0, x1, z1, col, row):
+        """Liang-Barsky: does the segment overlap the unit cell (col, row) for a positive length?"""
+        t0, t1 = 0.0, 1.0
+        for p, q in ((-(x1 - x0), x0 - col), (x1 - x0, col + 1 - x0),
+                     (-(z1 - z0), z0 - row), (z1 - z0, row + 1 - z0)):
+            if p == 0:
+                if q < 0:
+                    return False
+            elif p < 0:
+                t0 = max(t0, q / p)
+            else:
+                t1 = min(t1, q / p)
+        return t0 < t1
+    
+    def test_batched_matches_reference(self):
+        """Batched LOS should match an exact segment / occupied-cell intersection test."""
+        grid = np.zeros((10, 10), dtype=bool)
+        grid[4:6, 4:6] = True
+        grid[0:2, 8:10] = True
+        grid[7, 1] = True
+        bounds = {'min_x': 0, 'max_x': 10, 'min_z': 0, 'max_z': 10}
+        
+        rng = np.random.default_rng(7)
+        x0, z0, x1, z1 = rng.uniform(0, 10, size=(4, 500))
+        blocked = los_blocked_pairs(x0, z0, x1, z1, grid, bounds, 1.0)
+        
+        # Blocked when the ray crosses any occupied cell other than its start cell
+        occupied = list(zip(*np.nonzero(grid)))
+        expected = [
+            any(self._segment_hits_cell(a, b, c, d, col, row)
+                for row, col in occupied if (row, col) != (int(b), int(a)))
+            for a, b, c, d in zip(x0, z0, x1, z1)
+        ]
+        self.assertEqual(blocked.tolist(), expected)
+        self.assertTrue(blocked.any())
+        self.assertFalse(blocked.all())
+
+
+class TestKernelFallbacks(unittest.TestCase):
+    """Test that the NumPy kernels agree with the active (possibly Numba) ones."""
+    
+    def test_pnpoly_numpy_matches(self):
+        rng = np.random.default_rng(5)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, 30))
+        radii = rng.uniform(3, 10, 30)
+        verts = np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+        xs, zs = rng.uniform(-10, 10, size=(2, 2000))
+        
+        self.assertEqual(
+            _kernels._pnpoly_numpy(xs, zs, verts).tolist(),
+            _kernels.pnpoly_batch(xs, zs, verts).tolist()
+        )
+    
+    def test_los_numpy_matches(self):
+        rng = np.random.default_rng(6)
+        grid = rng.random((20, 70)) < 0.1
+        grid_bits = _kernels.pack_grid_bits(grid)
+        x0, x1 = rng.uniform(-1, 71, size=(2, 500))
+        z0, z1 = rng.uniform(-1, 21, size=(2, 500))
+        
+        self.assertEqual(
+            _kernels._los_pairs_numpy(x0, z0, x1, z1, grid_bits, 70, 0.0, 0.0, 1.0).tolist(),
+            _kernels.los_pairs(x0, z0, x1, z1, grid_bits, 70, 0.0, 0.0, 1.0).tolist()
+        )
+    
+    def test_wedge_numpy_matches(self):
+        rng = np.random.default_rng(10)
+        xs, zs = rng.uniform(0, 20, size=(2, 400))
+        pos_xs, pos_zs = np.array([5.0, 15.0, 10.0]), np.array([5.0, 15.0, 10.0])
+        pos_points = np.concatenate([np.arange(0, 200), np.arange(100, 400), np.arange(400)])
+        pos_indptr = np.array([0, 200, 500, 900])
+        pos_of_cand = np.repeat([0, 1, 2], 12)
+        yaw = np.radians(np.tile(np.arange(0, 360, 30.0), 3))
+        args = (pos_indptr, pos_points, xs, zs, pos_xs, pos_zs, pos_of_cand,
+                np.cos(yaw), np.sin(yaw), math.cos(math.radians(45)))
+        
+        expected = _kernels._wedge_numpy(*args)
+        got = _kernels.wedge_filter(*args)
+        self.assertEqual(got[0].tolist(), expected[0].tolist())
+        self.assertEqual(got[1].tolist(), expected[1].tolist())
+    
+    @unittest.skipUnless(_kernels.HAS_GEOM_C, "_geom_c extension not built")
+    def test_geom_c_matches_numpy(self):
+        rng = np.random.default_rng(9)
+        verts = np.array([[0, 0], [8, 0], [8, 8], [4, 3], [0, 8]], dtype=np.float64)
+        xs, zs = rng.uniform(-1, 9, size=(2, 2000))
+        self.assertEqual(
+            _kernels._geom_c.pnpoly_batch(xs, zs, verts).tolist(),
+            _kernels._pnpoly_numpy(xs, zs, verts).tolist()
+        )
+        
+        grid_bits = _kernels.pack_grid_bits(rng.random((20, 70)) < 0.1)
+        x0, x1 = rng.uniform(-1, 71, size=(2, 500))
+        z0, z1 = rng.uniform(-1, 21, size=(2, 500))
+        self.assertEqual(
+            _kernels._geom_c.los_batch(x0, z0, x1, z1, grid_bits, 70, 0.0, 0.0, 1.0).tolist(),
+            _kernels._los_pairs_numpy(x0, z0, x1, z1, grid_bits, 70, 0.0, 0.0, 1.0).tolist()
+        )
+    
+    def test_pack_grid_bits(self):
+        """Every cell should land on bit c & 63 of word [r, c >> 6]."""
+        rng = np.random.default_rng(8)
+        grid = rng.random((5, 130)) < 0.3
+        grid_bits = _kernels.pack_grid_bits(grid)
+        self.assertEqual(grid_bits.shape, (5, 3))
+        rows, cols = np.indices(grid.shape)
+        bits = (grid_bits[rows, cols >> 6] >> (cols & 63).astype(np.uint64)) & np.uint64(1)
+        self.assertTrue(np.array_equal(bits.astype(bool), grid))
+
+
+class TestSpatialHash(unittest.TestCase):
+    """Test the bucketed range query used by compute_coverage_sets."""
+    
+    def test_hash_matches_dense(self):
+        """Bucketed and brute-force range queries should return the same points."""
+        rng = np.random.default_rng(2)
+        pts = rng.uniform(0, 30, size=(2000, 2))
+        cands = rng.uniform(-5, 35, size=(100, 2))
+        self.assertGreaterEqual(len(pts), solver.SPATIAL_HASH_MIN_POINTS)
+        
+        hashed = solver.points_in_range(cands, pts, 2.5)
+        dx = pts[None, :, 0] - cands[:, None, 0]
+        dz = pts[None, :, 1] - cands[:, None, 1]
+        dense = [np.flatnonzero(row) for row in dx * dx + dz * dz <= 2.5 ** 2]
+        for got, expected in zip(hashed, dense):
+            self.assertEqual(got.tolist(), expected.tolist())
+
+
+class TestCoverageBits(unittest.TestCase):
+    """Test packed uint64 coverage bitsets."""
+    
+    @staticmethod
+    def _pack_bits(point_positions, n_points):
+        """Reference bitset of one row via a boolean mask and np.packbits."""
+        n_words = (n_points + 63) // 64
+        mask = np.zeros(n_words * 64, dtype=bool)
+        mask[point_positions] = True
+        return np.packbits(mask, bitorder='little').view('<u8')
+    
+    def test_pack_unpack_roundtrip(self):
+        """Unpacking a packed bitset should recover the covered positions."""
+        positions = np.array([0, 5, 63, 64, 129])
+        bits = solver.pack_coverage_rows([positions], 130)[0]
+        self.assertEqual(bits.dtype, np.uint64)
+        self.assertEqual(len(bits), 3)
+        self.assertEqual(np.flatnonzero(unpack_coverage_bits(bits, 130)).tolist(), positions.tolist())
+    
+    def test_popcount64(self):
+        """popcount64 should count the set bits of every word."""
+        words = np.array([0, 1, 2**63, 2**64 - 1, 0x00FF00FF00FF00FF], dtype=np.uint64)
+        self.assertEqual(popcount64(words).tolist(), [bin(int(w)).count('1') for w in words])
+    
+    def test_pack_rows_matches_single_rows(self):
+        """Packing all rows at once should match packing them one by one."""
+        rng = np.random.default_rng(12)
+        covered_sets = [np.flatnonzero(rng.random(130) < p) for p in (0.0, 0.05, 0.5, 1.0)]
+        expected = np.stack([self._pack_bits(cov, 130) for cov in covered_sets])
+        self.assertTrue(np.array_equal(solver.pack_coverage_rows(covered_sets, 130), expected))
+    
+    def test_coverage_levels_match_counts(self):
+        """levels[j] should mark the points covered by at least j + 1 rows."""
+        rng = np.random.default_rng(4)
+        covered = rng.random((6, 130)) < 0.4
+        bits = np.stack([self._pack_bits(np.flatnonzero(row), 130) for row in covered])
+        levels = solver.coverage_levels(bits, 3)
+        counts = covered.sum(axis=0)
+        for j, level in enumerate(levels):
+            self.assertEqual(unpack_coverage_bits(level, 130).tolist(), (counts > j).tolist())
+    
+    def test_bits_match_covered_points(self):
+        """compute_coverage_sets should fill cov_bits consistently with covered_points."""
+        points = SamplePoints.from_list(
+            [SamplePoint(idx=i, x=float(i % 10), z=float(i // 10)) for i in range(100)])
+        candidates = Candidates.from_list([Candidate(idx=0, x=2.0, z=2.0, yaw_deg=0.0),
+                                           Candidate(idx=1, x=7.0, z=7.0, yaw_deg=90.0)])
+        model = LidarModel(hfov_deg=90, dome_mode=False)
+        compute_coverage_sets(candidates, points, model, 4.0, False, None, None, 0.25)
+        
+        for c in candidates:
+            self.assertGreater(len(c.covered_points), 0)
+            unpacked = unpack_coverage_bits(c.cov_bits, len(points))
+            self.assertEqual(np.flatnonzero(unpacked).tolist(), c.covered_points)
+    
+    def test_coverage_csr_matches_covered(self):
+        """CSR rows should list each candidate's covered points."""
+        points = SamplePoints.from_list(
+            [SamplePoint(idx=i, x=float(i % 10), z=float(i // 10)) for i in range(100)])
+        candidates = Candidates.from_list([Candidate(idx=i, x=x, z=2.0, yaw_deg=0.0)
+                                           for i, x in enumerate((-20.0, 2.0, 7.0))])
+        compute_coverage_sets(candidates, points, LidarModel(), 4.0, False, None, None, 0.25)
+        
+        indptr, indices = solver.coverage_csr(candidates)
+        self.assertEqual(indptr[1], 0)
+        for c in candidates:
+            self.assertEqual(indices[indptr[c.idx]:indptr[c.idx + 1]].tolist(), c.covered_points)
+
+
+class TestGreedyWarmStart(unittest.TestCase):
+    """Test the greedy k-cover used to warm-start CP-SAT."""
+    
+    def test_greedy_meets_k_coverage(self):
+        """Greedy selection should k-cover every coverable point."""
+        points = SamplePoints.from_list(
+            [SamplePoint(idx=i, x=float(i % 10), z=float(i // 10)) for i in range(100)])
+        candidates = Candidates.from_list(
+            [Candidate(idx=i, x=x, z=z, yaw_deg=0.0)
+             for i, (x, z) in enumerate((x, z) for x in (1.5, 4.5, 7.5) for z in (1.5, 4.5, 7.5))])
+        compute_coverage_sets(candidates, points, LidarModel(), 6.0, False, None, None, 0.25)
+        settings = PlannerSettings(overlap_mode='everywhere', k_required=2)
+        
+        selected, feasible = greedy_k_cover(candidates, points, settings)
+        
+        self.assertTrue(feasible)
+        counts = np.zeros(len(points), dtype=int)
+        for idx in selected:
+            counts += unpack_coverage_bits(candidates[idx].cov_bits, len(points))
+        self.assertTrue(np.all(counts >= 2))
+        self.assertEqual(len(selected), len(set(selected)))
+
+
+class TestSolveKCoverage(unittest.TestCase):
+    """Test the CP-SAT k-coverage model."""
+    
+    def setUp(self):
+        self.points = SamplePoints.from_list(
+            [SamplePoint(idx=i, x=float(i % 10), z=float(i // 10)) for i in range(100)])
+    
+    def _solve_capturing_model(self, candidates, settings):
+        """solve_k_coverage, also returning the CpModel it built."""
+        models = []
+        solve = cp_model.CpSolver.Solve
+        
+        def capture(cp_solver, model, *args):
+            models.append(model)
+            return solve(cp_solver, model, *args)
+        
+        with mock.patch.object(cp_model.CpSolver, 'Solve', autospec=True, side_effect=capture):
+            result = solver.solve_k_coverage(candidates, self.points, settings)
+        return result, models[0]
+    
+    def test_duplicate_candidates_still_k_cover(self):
+        """Symmetry breaking should still allow several interchangeable candidates."""
+        # 0 and 1 have identical coverage, 2 covers nothing, 3 covers only part
+        candidates = Candidates.from_list(
+            [Candidate(idx=i, x=x, z=z, yaw_deg=0.0)
+             for i, (x, z) in enumerate(((4.5, 4.5), (4.5, 4.5), (50.0, 50.0), (1.0, 1.0)))])
+        compute_coverage_sets(candidates, self.points, LidarModel(), 8.0, False, None, None, 0.25)
+        self.assertEqual(len(candidates[0].covered_points), 100)
+        settings = PlannerSettings(overlap_mode='everywhere', k_required=2, solver_time_limit_s=5.0)
+        
+        (selected, status, ok), model = self._solve_capturing_model(candidates, settings)
+        
+        self.assertTrue(ok)
+        self.assertEqual(status, "OPTIMAL")
+        self.assertEqual(sorted(selected), [0, 1])
+        fixed_zero = [
+            list(ct.linear.vars) for ct in model.Proto().constraints
+            if len(ct.linear.vars) == 1 and list(ct.linear.domain) == [0, 0]
+        ]
+        self.assertEqual(fixed_zero, [[2]])
+    
+    def test_greedy_bound_only_when_feasible(self):
+        """An infeasible greedy cover must not bound the model; the k=1 retry still solves."""
+        # Only candidate 0 reaches the points far from both corners, e.g. (9, 0)
+        candidates = Candidates.from_list(
+            [Candidate(idx=i, x=x, z=z, yaw_deg=0.0)
+             for i, (x, z) in enumerate(((4.5, 4.5), (-4.0, -4.0), (13.0, 13.0)))])
+        compute_coverage_sets(candidates, self.points, LidarModel(), 8.0, False, None, None, 0.25)
+        
+        def size_bounds(model):
+            return [
+                list(ct.linear.domain) for ct in model.Proto().constraints
+                if sorted(ct.linear.vars) == list(range(len(candidates)))
+            ]
+        
+        settings = PlannerSettings(overlap_mode='everywhere', k_required=2, solver_time_limit_s=5.0)
+        self.assertFalse(greedy_k_cover(candidates, self.points, settings)[1])
+        (selected, status, ok), model = self._solve_capturing_model(candidates, settings)
+        self.assertFalse(ok)
+        self.assertEqual(status, "INFEASIBLE")
+        self.assertEqual(size_bounds(model), [])
+        
+        # The relaxed retry of solve_lidar_placement
+        settings.k_required = 1
+        greedy_selected, feasible = greedy_k_cover(candidates, self.points, settings)
+        self.assertTrue(feasible)
+        (selected, status, ok), model = self._solve_capturing_model(candidates, settings)
+        self.assertTrue(ok)
+        self.assertEqual(selected, [0])
+        self.assertEqual(len(size_bounds(model)), 1)
+        self.assertEqual(size_bounds(model)[0][-1], len(greedy_selected))
 
 
 class TestSolverFeasibility(unittest.TestCase):
@@ -299,7 +699,8 @@ class TestSolverFeasibility(unittest.TestCase):
                 'overlap_mode': 'everywhere',
                 'k_required': 2,
                 'solver_time_limit_s': 5.0,
-                'seed': 12345
+                'seed': 12345,
+                'deterministic': True
             }
         }
         
@@ -312,6 +713,49 @@ class TestSolverFeasibility(unittest.TestCase):
         for p1, p2 in zip(result1['selected_positions'], result2['selected_positions']):
             self.assertAlmostEqual(p1['x'], p2['x'], places=4)
             self.assertAlmostEqual(p1['z'], p2['z'], places=4)
+    
+    def test_seed_portfolio(self):
+        """A seed portfolio should solve in place of the single run, reproducibly."""
+        params = {
+            'roi_polygon': [
+                {'x': 0, 'z': 0},
+                {'x': 12, 'z': 0},
+                {'x': 12, 'z': 12},
+                {'x': 0, 'z': 12}
+            ],
+            'model': {'hfov_deg': 360, 'vfov_deg': 60, 'range_m': 8, 'dome_mode': True},
+            'settings': {
+                'sample_spacing_m': 1.0,
+                'candidate_spacing_m': 4.0,
+                'k_required': 2,
+                'solver_time_limit_s': 5.0,
+                'seed': 7,
+                'seed_portfolio': 2
+            }
+        }
+        
+        result1 = solve_lidar_placement(params)
+        result2 = solve_lidar_placement(params)
+        
+        self.assertTrue(result1['success'])
+        self.assertEqual(result1['selected_positions'], result2['selected_positions'])
+    
+    def test_seed_portfolio_capped_at_cpus(self):
+        """A portfolio should run no more seeds than the solve has CPUs."""
+        points = SamplePoints.from_list(
+            [SamplePoint(idx=i, x=float(i % 10), z=float(i // 10)) for i in range(100)])
+        candidates = Candidates.from_list(
+            [Candidate(idx=i, x=x, z=z, yaw_deg=0.0)
+             for i, (x, z) in enumerate((x, z) for x in (1.5, 7.5) for z in (1.5, 7.5))])
+        compute_coverage_sets(candidates, points, LidarModel(), 10.0, False, None, None, 0.25)
+        settings = PlannerSettings(k_required=1, solver_time_limit_s=2.0, seed=7, seed_portfolio=4)
+        
+        with mock.patch.dict(os.environ, {'LIDAR_SOLVER_CPUS': '2'}), \
+                mock.patch.object(solver, 'solve_k_coverage', wraps=solver.solve_k_coverage) as solve:
+            selected, status, ok = solver.solve_seed_portfolio(candidates, points, settings)
+        
+        self.assertTrue(ok)
+        self.assertEqual(sorted(c.args[2].seed for c in solve.call_args_list), [7, 8])
 
 
 class TestPartialHfov(unittest.TestCase):
@@ -335,6 +779,55 @@ class TestPartialHfov(unittest.TestCase):
         # 360° should have fewer candidates (1 yaw per position)
         # 90° should have more candidates (multiple yaws per position)
         self.assertGreater(len(candidates_90), len(candidates_360))
+    
+    @staticmethod
+    def _refine_yaw_reference(selected_indices, candidates):
+        """Group selected candidates by position; the first one covering the most points wins."""
+        positions = {}
+        for idx in selected_indices:
+            c = candidates[idx]
+            positions.setdefault((round(c.x, 4), round(c.z, 4)), []).append(c)
+        refined_yaw = {}
+        for pos_candidates in positions.values():
+            best = pos_candidates[0]
+            for c in pos_candidates:
+                if len(c.covered_points) > len(best.covered_points):
+                    best = c
+            for c in pos_candidates:
+                refined_yaw[c.idx] = best.yaw_deg
+        return refined_yaw
+    
+    def test_refine_yaw_matches_grouping(self):
+        """Refined yaws should match grouping the selection by position."""
+        polygon = [{'x': 0, 'z': 0}, {'x': 12, 'z': 0}, {'x': 12, 'z': 9}, {'x': 0, 'z': 9}]
+        model = LidarModel(hfov_deg=90, dome_mode=False)
+        candidates = generate_candidates(polygon, 3.0, 0.5, model, 42, None)
+        points = sample_points_in_polygon(polygon, 0.75, 42)
+        compute_coverage_sets(candidates, points, model, 6.0, False, None, None, 0.25)
+        
+        rng = np.random.default_rng(19)
+        for _ in range(50):
+            selected = rng.choice(len(candidates), size=rng.integers(1, 40), replace=False).tolist()
+            self.assertEqual(
+                solver.refine_yaw_angles(selected, candidates, points, model, 6.0),
+                self._refine_yaw_reference(selected, candidates)
+            )
+    
+    def test_refine_yaw_without_position_layout(self):
+        """Positions should come from coordinates, not the candidate order or position_ids."""
+        xs = np.array([1.0, 5.0, 1.0, 5.0, 1.0])
+        yaws = np.array([0.0, 0.0, 90.0, 90.0, 180.0])
+        candidates = Candidates(xs, np.full(5, 3.0), yaws)
+        points = sample_points_in_polygon(
+            [{'x': 0, 'z': 0}, {'x': 6, 'z': 0}, {'x': 6, 'z': 6}, {'x': 0, 'z': 6}], 0.5, 1)
+        model = LidarModel(hfov_deg=90, dome_mode=False)
+        compute_coverage_sets(candidates, points, model, 3.0, False, None, None, 0.25)
+        
+        selected = [4, 3, 0, 1, 2]
+        refined = solver.refine_yaw_angles(selected, candidates, points, model, 3.0)
+        self.assertEqual(refined, self._refine_yaw_reference(selected, candidates))
+        self.assertEqual(len({refined[i] for i in (0, 2, 4)}), 1)
+        self.assertEqual(refined[1], refined[3])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for the LiDAR placement solver.
+
+    gunicorn --workers 2 --threads 1 --timeout 600 --bind 0.0.0.0:3002 wsgi:app
+"""
+
+from server import app
+
+__all__ = ['app']